@@ -0,0 +1,47 @@
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Tuple
+
+# Backend attributes that identify the backend rather than hold state, they are never copied or restored.
+_IDENTITY_ATTRIBUTES = {"region_name", "account_id"}
+
+
+@dataclass
+class AwsSnapshot:
+    # service -> (account, region) -> backend attributes
+    services: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = field(default_factory=dict)
+
+
+def _region_backends(backends: Dict) -> Iterator[Tuple[Tuple[str, str], Any]]:
+    # moto keeps either region -> backend, or account -> region -> backend in later 3.x releases.
+    # dict methods are used directly since moto's backend dicts create backends on lookup.
+    for key, value in dict.items(backends):
+        if isinstance(value, dict):
+            for region, backend in dict.items(value):
+                yield (key, region), backend
+        else:
+            yield ("", key), value
+
+
+def take_snapshot(mocks: Dict[str, Any]) -> AwsSnapshot:
+    snapshot = AwsSnapshot()
+    for service, mock in mocks.items():
+        snapshot.services[service] = {
+            key: copy.deepcopy({k: v for k, v in vars(backend).items() if k not in _IDENTITY_ATTRIBUTES})
+            for key, backend in _region_backends(mock.backends)
+        }
+    return snapshot
+
+
+def restore_snapshot(mocks: Dict[str, Any], snapshot: AwsSnapshot):
+    # Backends are restored in place, so clients and mocks that hold on to them keep working. The snapshot itself
+    # is copied again, it can be restored any number of times.
+    for service, mock in mocks.items():
+        saved = snapshot.services.get(service, {})
+        for key, backend in _region_backends(mock.backends):
+            if key not in saved:
+                backend.reset()
+                continue
+            for name in [name for name in vars(backend) if name not in _IDENTITY_ATTRIBUTES]:
+                delattr(backend, name)
+            vars(backend).update(copy.deepcopy(saved[key]))
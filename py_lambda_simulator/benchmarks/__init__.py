@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Any
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return self.name + "".join(f" {k}={v}" for k, v in sorted(self.params.items()))
+
+
+BENCHMARKS = ["imports", "events", "sqs", "http", "lifecycle", "seeding", "kinesis"]
+
+
+async def run_benchmarks(selected: List[str], quick: bool = False) -> List[BenchmarkResult]:
+    from py_lambda_simulator.benchmarks import (
+        event_construction,
+        http_throughput,
+        import_time,
+        kinesis_iterator_age,
+        lifecycle,
+        seeding,
+        sqs_throughput,
+    )
+
+    results = []
+    if "imports" in selected:
+        results.extend(import_time.run(iterations=1 if quick else 10))
+    if "events" in selected:
+        results.extend(event_construction.run(iterations=1_000 if quick else 100_000))
+    if "sqs" in selected:
+        for batch_size in (1, 10, 100):
+            results.append(await sqs_throughput.run(batch_size, message_count=100 if quick else 2_000))
+    if "http" in selected:
+        results.append(await http_throughput.run(clients=4 if quick else 32, requests_per_client=10 if quick else 200))
+    if "lifecycle" in selected:
+        results.append(await lifecycle.run(iterations=3 if quick else 20))
+    if "seeding" in selected:
+        results.extend(seeding.run(count=200 if quick else 20_000))
+    if "kinesis" in selected:
+        # A single lane handles about 500 records per second, the rate needs two lanes to keep up.
+        for parallelization_factor in (1, 2, 4):
+            results.append(
+                await kinesis_iterator_age.run(
+                    parallelization_factor, records_per_second=800, seconds=1 if quick else 10
+                )
+            )
+    return results
+
+
+def compare(results: List[BenchmarkResult], baseline: Dict) -> List[str]:
+    previous = {BenchmarkResult(**r).key: r["metrics"] for r in baseline["results"]}
+    lines = []
+    for result in results:
+        for metric, value in result.metrics.items():
+            before = previous.get(result.key, {}).get(metric)
+            if before:
+                lines.append(
+                    f"{result.key:<40} {metric:<20} {before:>12.4f} -> {value:>12.4f} ({value / before:>6.2f}x)"
+                )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulator's hot paths.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"comma separated subset of {BENCHMARKS}")
+    parser.add_argument("--quick", action="store_true", help="small iteration counts, for smoke testing")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    # moto needs a region, the benchmarks never talk to real AWS.
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    # Per-invocation info logging would dominate the measurements.
+    logging.getLogger("py_lambda_simulator").setLevel(logging.WARNING)
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks {sorted(unknown)}")
+
+    results = asyncio.run(run_benchmarks(selected, quick=args.quick))
+    for result in results:
+        metrics = ", ".join(f"{k}={v:.4f}" for k, v in result.metrics.items())
+        print(f"{result.key:<40} {metrics}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "timestamp": time.time(),
+                    "python": sys.version.split()[0],
+                    "platform": platform.platform(),
+                    "results": [asdict(result) for result in results],
+                },
+                file,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print("\n".join(compare(results, json.load(file))))
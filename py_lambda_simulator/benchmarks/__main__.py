@@ -0,0 +1,3 @@
+from py_lambda_simulator.benchmarks import main
+
+main()
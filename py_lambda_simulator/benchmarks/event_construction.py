@@ -0,0 +1,74 @@
+import time
+from typing import List
+
+from py_lambda_simulator.benchmarks import BenchmarkResult
+from py_lambda_simulator.event_decoders import encode, get_decoder
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, RequestContext, Record, SqsEvent
+
+
+def _api_gateway_event() -> ApiGatewayProxyEvent:
+    return ApiGatewayProxyEvent(
+        body={"key": "value"},
+        resource="resource",
+        path="/http",
+        headers={"Content-Type": "application/json"},
+        requestContext=RequestContext(
+            stage="stage",
+            identity=None,
+            resourceId="resId",
+            apiId="apiId",
+            resourcePath="/http",
+            httpMethod="POST",
+            requestId="reqId",
+            accountId="accId",
+        ),
+        queryStringParameters={},
+        pathParameters={},
+        httpMethod="POST",
+        stageVariables={},
+    )
+
+
+def _sqs_event() -> SqsEvent:
+    return SqsEvent(
+        Records=[
+            Record(
+                messageId="id",
+                receiptHandle="handle",
+                body='{"key": "value"}',
+                attributes={},
+                messageAttributes={},
+                md5OfBody="md5",
+                eventSource="aws:sqs",
+                eventSourceARN="arn",
+                awsRegion="us-east-1",
+            )
+        ]
+    )
+
+
+def _measure(name: str, factory, iterations: int) -> BenchmarkResult:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        factory()
+    elapsed = time.perf_counter() - started
+    return BenchmarkResult(
+        name=name,
+        params={"iterations": iterations},
+        metrics={"ops_per_second": iterations / elapsed, "microseconds_per_op": elapsed / iterations * 1e6},
+    )
+
+
+def run(iterations: int) -> List[BenchmarkResult]:
+    api_gateway_json = encode(_api_gateway_event())
+    sqs_json = encode(_sqs_event(), SqsEvent)
+    decode_api_gateway = get_decoder(ApiGatewayProxyEvent)
+    decode_api_gateway_lazily = get_decoder(ApiGatewayProxyEvent, lazy=True)
+    decode_sqs = get_decoder(SqsEvent)
+    return [
+        _measure("api_gateway_event_construction", _api_gateway_event, iterations),
+        _measure("sqs_event_construction", _sqs_event, iterations),
+        _measure("api_gateway_event_decoding", lambda: decode_api_gateway(api_gateway_json), iterations),
+        _measure("api_gateway_event_lazy_decoding", lambda: decode_api_gateway_lazily(api_gateway_json), iterations),
+        _measure("sqs_event_decoding", lambda: decode_sqs(sqs_json), iterations),
+    ]
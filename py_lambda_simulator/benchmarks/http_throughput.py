@@ -0,0 +1,48 @@
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from py_lambda_simulator.benchmarks import BenchmarkResult
+from py_lambda_simulator.http_lambda_simulator import HttpLambdaSimulator, LambdaHttpFunc
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent
+from py_lambda_simulator.recording import LatencyStats
+
+
+async def run(clients: int, requests_per_client: int) -> BenchmarkResult:
+    simulator = HttpLambdaSimulator(port=0)
+
+    def http_handler(event: ApiGatewayProxyEvent, context):
+        return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(event.body)}
+
+    simulator.add_func(
+        LambdaHttpFunc(name="benchmark-http-lambda", method="POST", path="/http", handler_func=http_handler)
+    )
+    await simulator.start()
+    url = f"http://{simulator.host}:{simulator.port}/http"
+    latencies = []
+
+    async def client(session: aiohttp.ClientSession):
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            async with session.post(url, json={"n": i}) as resp:
+                await resp.read()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    await simulator.stop()
+
+    stats = LatencyStats.of(latencies)
+    return BenchmarkResult(
+        name="http_throughput",
+        params={"clients": clients, "requests_per_client": requests_per_client},
+        metrics={
+            "requests_per_second": len(latencies) / elapsed,
+            "p50_ms": stats.p50 * 1000,
+            "p99_ms": stats.p99 * 1000,
+        },
+    )
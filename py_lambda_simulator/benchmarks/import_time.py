@@ -0,0 +1,32 @@
+import subprocess
+import sys
+import time
+from typing import List
+
+from py_lambda_simulator.benchmarks import BenchmarkResult
+
+STATEMENTS = {
+    "core": "import py_lambda_simulator.lambda_simulator",
+    "sqs": "from py_lambda_simulator.sqs_lambda_simulator import SqsLambdaSimulator",
+    "http": "from py_lambda_simulator.http_lambda_simulator import HttpLambdaSimulator",
+    "aws": "from py_lambda_simulator.lambda_simulator import AwsSimulator; AwsSimulator(services=['sqs'])",
+}
+
+
+def run(iterations: int) -> List[BenchmarkResult]:
+    # Every sample is a fresh interpreter, that is what short-lived test and CLI processes pay.
+    results = []
+    for name, statement in STATEMENTS.items():
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", statement], check=True)
+            samples.append(time.perf_counter() - started)
+        results.append(
+            BenchmarkResult(
+                name="import_time",
+                params={"module": name},
+                metrics={"min_ms": min(samples) * 1000, "mean_ms": sum(samples) / iterations * 1000},
+            )
+        )
+    return results
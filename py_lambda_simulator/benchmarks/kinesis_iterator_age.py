@@ -0,0 +1,77 @@
+import asyncio
+import json
+import threading
+import time
+
+from py_lambda_simulator.benchmarks import BenchmarkResult
+from py_lambda_simulator.kinesis_lambda_simulator import KinesisLambdaSimulator, LambdaKinesisFunc
+from py_lambda_simulator.lambda_events import KinesisEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+
+
+async def run(
+    parallelization_factor: int,
+    records_per_second: int,
+    seconds: float,
+    seconds_per_record: float = 0.002,
+    catch_up_timeout: float = 60.0,
+) -> BenchmarkResult:
+    # Records are put at a steady rate while a handler that takes seconds_per_record per record consumes them. The
+    # iterator age stays flat when the lanes keep up and grows for as long as the ingest lasts when they do not.
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("benchmark-stream")
+    client = aws_simulator.get_kinesis_client()
+    simulator = KinesisLambdaSimulator()
+    simulator.poll_interval_seconds = 0.1
+    total = int(records_per_second * seconds)
+    received = {"records": 0}
+    # With a parallelization factor above one, handlers of different lanes run in threads at the same time.
+    received_lock = threading.Lock()
+
+    def kinesis_handler(event: KinesisEvent, context):
+        time.sleep(seconds_per_record * len(event["Records"]))
+        with received_lock:
+            received["records"] += len(event["Records"])
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="benchmark-kinesis-lambda",
+            stream_name="benchmark-stream",
+            handler_func=kinesis_handler,
+            parallelization_factor=parallelization_factor,
+        )
+    )
+
+    async def ingest():
+        tick = 0.1
+        per_tick = max(1, int(records_per_second * tick))
+        for start in range(0, total, per_tick):
+            records = [
+                {"Data": json.dumps({"n": n}).encode(), "PartitionKey": f"key-{n % 100}"}
+                for n in range(start, min(start + per_tick, total))
+            ]
+            await simulator.clock.run_in_thread(client.put_records, StreamName="benchmark-stream", Records=records)
+            await asyncio.sleep(tick)
+        # A consumer that falls too far behind ends the run instead of hanging it,
+        # records then falls short of the total.
+        deadline = time.monotonic() + catch_up_timeout
+        while received["records"] < total and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        simulator.stop()
+
+    started = time.perf_counter()
+    task = asyncio.ensure_future(simulator.start())
+    await simulator.wait_until_ready()
+    await asyncio.gather(task, ingest())
+    elapsed = time.perf_counter() - started
+    aws_simulator.shutdown()
+
+    return BenchmarkResult(
+        name="kinesis_iterator_age",
+        params={"parallelization_factor": parallelization_factor, "records_per_second": records_per_second},
+        metrics={
+            "max_iterator_age": simulator.get_max_iterator_age("benchmark-kinesis-lambda"),
+            "records": received["records"],
+            "records_per_second": received["records"] / elapsed,
+        },
+    )
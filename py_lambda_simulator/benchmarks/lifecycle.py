@@ -0,0 +1,27 @@
+from py_lambda_simulator.benchmarks import BenchmarkResult
+from py_lambda_simulator.lambda_simulator import AwsSimulator, Simulator
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc
+
+
+async def run(iterations: int) -> BenchmarkResult:
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_sqs_queue("benchmark-queue")
+    startup = []
+    drain = []
+    for _ in range(iterations):
+        simulator = Simulator(port=0)
+        simulator.add_func(LambdaSqsFunc(name="benchmark-sqs-lambda", queue_name="benchmark-queue", handler_func=print))
+        await simulator.start()
+        await simulator.stop()
+        startup.append(simulator.lifecycle.startup_seconds)
+        drain.append(simulator.lifecycle.drain_seconds)
+    aws_simulator.shutdown()
+
+    return BenchmarkResult(
+        name="simulator_start_stop",
+        params={"iterations": iterations},
+        metrics={
+            "start_ms": sum(startup) / iterations * 1000,
+            "stop_ms": sum(drain) / iterations * 1000,
+        },
+    )
@@ -0,0 +1,31 @@
+from typing import List
+
+from py_lambda_simulator.benchmarks import BenchmarkResult
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+
+
+def run(count: int) -> List[BenchmarkResult]:
+    results = []
+    for direct in (False, True):
+        aws_simulator = AwsSimulator()
+        aws_simulator.create_sqs_queue("benchmark-queue")
+        aws_simulator.create_dynamodb_table(
+            "benchmark-table",
+            key_schema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            attribute_definition=[{"AttributeName": "pk", "AttributeType": "S"}],
+        )
+        # moto slows down with every message already in the queue, the API path is measured on a smaller batch.
+        sqs_count = count if direct else count // 10
+        sqs = aws_simulator.seed_sqs_queue("benchmark-queue", ({"n": i} for i in range(sqs_count)), direct=direct)
+        dynamodb = aws_simulator.seed_dynamodb_table(
+            "benchmark-table", ({"pk": str(i), "n": i} for i in range(count)), direct=direct
+        )
+        aws_simulator.shutdown()
+        results.append(
+            BenchmarkResult(
+                name="seeding",
+                params={"direct": direct, "count": count},
+                metrics={"sqs_per_second": sqs.rate, "dynamodb_per_second": dynamodb.rate},
+            )
+        )
+    return results
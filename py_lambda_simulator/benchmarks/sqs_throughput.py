@@ -0,0 +1,55 @@
+import json
+import time
+
+from py_lambda_simulator.benchmarks import BenchmarkResult
+from py_lambda_simulator.lambda_events import SqsEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
+
+
+async def run(batch_size: int, message_count: int) -> BenchmarkResult:
+    aws_simulator = AwsSimulator()
+    queue = aws_simulator.create_sqs_queue("benchmark-queue")
+    client = aws_simulator.get_sqs_client()
+    for start in range(0, message_count, 10):
+        client.send_message_batch(
+            QueueUrl=queue["queue_url"],
+            Entries=[
+                {"Id": str(i), "MessageBody": json.dumps({"n": i})}
+                for i in range(start, min(start + 10, message_count))
+            ],
+        )
+
+    simulator = SqsLambdaSimulator()
+    received = {"messages": 0, "invocations": 0}
+
+    def sqs_handler(event: SqsEvent, context):
+        received["messages"] += len(event["Records"])
+        received["invocations"] += 1
+        if received["messages"] >= message_count:
+            simulator.stop()
+
+    simulator.add_func(
+        LambdaSqsFunc(
+            name="benchmark-sqs-lambda",
+            queue_name="benchmark-queue",
+            handler_func=sqs_handler,
+            max_number_of_messages=batch_size,
+            maximum_batching_window_in_seconds=1 if batch_size > 10 else 0,
+        )
+    )
+
+    started = time.perf_counter()
+    await simulator.start()
+    elapsed = time.perf_counter() - started
+    aws_simulator.shutdown()
+
+    return BenchmarkResult(
+        name="sqs_throughput",
+        params={"batch_size": batch_size, "messages": message_count},
+        metrics={
+            "messages_per_second": received["messages"] / elapsed,
+            "invocations_per_second": received["invocations"] / elapsed,
+            "seconds": elapsed,
+        },
+    )
@@ -0,0 +1,134 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Clock:
+    is_virtual = False
+
+    def time(self) -> float:
+        raise NotImplementedError
+
+    async def sleep(self, delay: float):
+        raise NotImplementedError
+
+    async def run_in_thread(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        raise NotImplementedError
+
+    async def run_io(self, awaitable: Awaitable[T]) -> T:
+        """Awaits I/O done on the loop itself, e.g. an async AWS client call, without the clock moving past it."""
+        raise NotImplementedError
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        """Waits for event to be set or timeout seconds to pass, returns whether the event is set."""
+        if timeout is None:
+            await event.wait()
+            return True
+
+        waiter = asyncio.ensure_future(event.wait())
+        sleeper = asyncio.ensure_future(self.sleep(timeout))
+        try:
+            await asyncio.wait({waiter, sleeper}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            sleeper.cancel()
+        return event.is_set()
+
+
+class RealClock(Clock):
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+    async def run_in_thread(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        from asyncer import asyncify
+
+        return await asyncify(func)(*args, **kwargs)
+
+    async def run_io(self, awaitable: Awaitable[T]) -> T:
+        return await awaitable
+
+
+class VirtualClock(Clock):
+    """
+    A clock that jumps straight to the next pending sleep whenever every task on the loop is idle.
+
+    Work handed to threads or awaited I/O must go through run_in_thread or run_io so the clock can wait for it
+    before advancing.
+    Sleeps with the same deadline wake in the order they were started, which keeps runs reproducible.
+    Telling whether the loop is idle needs the ready queue of asyncio's own loops, other loops such as uvloop are
+    rejected instead of letting the clock run ahead of pending work.
+    """
+
+    is_virtual = True
+
+    def __init__(self, start: float = 0.0):
+        self.__now = start
+        self.__timers: List[Tuple[float, int, asyncio.Future]] = []
+        self.__sequence = itertools.count()
+        self.__busy = 0
+        self.__idle: Optional[asyncio.Event] = None
+        self.__driver: Optional[asyncio.Task] = None
+
+    def time(self) -> float:
+        return self.__now
+
+    async def sleep(self, delay: float):
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+
+        loop = asyncio.get_running_loop()
+        if not isinstance(getattr(loop, "_ready", None), collections.deque):
+            raise Exception(f"VirtualClock only supports asyncio's own event loops, not {type(loop).__name__}.")
+        future = loop.create_future()
+        heapq.heappush(self.__timers, (self.__now + delay, next(self.__sequence), future))
+        if self.__driver is None or self.__driver.done():
+            self.__driver = asyncio.ensure_future(self.__drive())
+        await future
+
+    async def run_in_thread(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        from asyncer import asyncify
+
+        return await self.run_io(asyncify(func)(*args, **kwargs))
+
+    async def run_io(self, awaitable: Awaitable[T]) -> T:
+        if self.__idle is None:
+            self.__idle = asyncio.Event()
+        self.__busy += 1
+        self.__idle.clear()
+        try:
+            return await awaitable
+        finally:
+            self.__busy -= 1
+            if self.__busy == 0:
+                self.__idle.set()
+
+    async def __drive(self):
+        while self.__timers:
+            await self.__wait_until_idle()
+            if not self.__timers:
+                break
+            deadline, _, future = heapq.heappop(self.__timers)
+            if future.done():
+                continue
+            self.__now = max(self.__now, deadline)
+            future.set_result(None)
+
+    async def __wait_until_idle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Each yield lets the loop poll for I/O and run everything that became ready in the meantime.
+            await asyncio.sleep(0)
+            if self.__busy:
+                await self.__idle.wait()
+                continue
+            if not loop._ready:
+                return
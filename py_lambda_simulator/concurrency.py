@@ -0,0 +1,126 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FunctionConcurrency:
+    reserved: Optional[int] = None
+    provisioned: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    invocations: int = 0
+    provisioned_invocations: int = 0
+    throttles: int = 0
+
+
+@dataclass
+class AccountConcurrency:
+    limit: int
+    unreserved_limit: int
+    in_flight: int
+    unreserved_in_flight: int
+    throttles: int
+
+
+class ConcurrencyGovernor:
+    """
+    Accounts concurrent invocations across every event source the way the Lambda service does.
+
+    Functions with reserved concurrency only draw from their reservation. Functions without a reservation
+    use their provisioned concurrency first and then share what is left of the account limit.
+    """
+
+    def __init__(self, account_limit: int = 1000, minimum_unreserved_concurrency: int = 100):
+        self.account_limit = account_limit
+        self.minimum_unreserved_concurrency = minimum_unreserved_concurrency
+        self.functions: Dict[str, FunctionConcurrency] = {}
+        self.__unreserved_in_flight = 0
+        self.__unreserved_limit = account_limit
+
+    def __get(self, name: str) -> FunctionConcurrency:
+        if name not in self.functions:
+            self.functions[name] = FunctionConcurrency()
+        return self.functions[name]
+
+    def __allocated(self, functions: Dict[str, FunctionConcurrency]) -> int:
+        return sum(f.reserved if f.reserved is not None else f.provisioned for f in functions.values())
+
+    def __check_allocation(self, name: str, candidate: FunctionConcurrency):
+        others = {n: f for n, f in self.functions.items() if n != name}
+        allocated = self.__allocated(others) + self.__allocated({name: candidate})
+        if self.account_limit - allocated < self.minimum_unreserved_concurrency:
+            raise Exception(
+                f"Allocating concurrency for {name} would leave less than "
+                f"{self.minimum_unreserved_concurrency} unreserved concurrency."
+            )
+
+    def set_reserved_concurrency(self, name: str, reserved: Optional[int]):
+        current = self.__get(name)
+        if reserved is not None and current.provisioned > reserved:
+            raise Exception(f"Reserved concurrency for {name} must be at least its provisioned concurrency.")
+        self.__check_allocation(name, FunctionConcurrency(reserved=reserved, provisioned=current.provisioned))
+        current.reserved = reserved
+        self.__recount_unreserved()
+
+    def set_provisioned_concurrency(self, name: str, provisioned: int):
+        current = self.__get(name)
+        if current.reserved is not None and provisioned > current.reserved:
+            raise Exception(f"Provisioned concurrency for {name} must not exceed its reserved concurrency.")
+        self.__check_allocation(name, FunctionConcurrency(reserved=current.reserved, provisioned=provisioned))
+        current.provisioned = provisioned
+        self.__recount_unreserved()
+
+    def __recount_unreserved(self):
+        self.__unreserved_limit = self.account_limit - self.__allocated(self.functions)
+        self.__unreserved_in_flight = sum(
+            max(0, f.in_flight - f.provisioned) for f in self.functions.values() if f.reserved is None
+        )
+
+    @property
+    def unreserved_limit(self) -> int:
+        return self.__unreserved_limit
+
+    def try_acquire(self, name: str) -> bool:
+        function = self.__get(name)
+        if function.reserved is not None:
+            allowed = function.in_flight < function.reserved
+        else:
+            allowed = function.in_flight < function.provisioned or (
+                self.__unreserved_in_flight < self.__unreserved_limit
+            )
+
+        if not allowed:
+            function.throttles += 1
+            logger.info(f"Throttling {name}, {function.in_flight} invocations in flight")
+            return False
+
+        if function.in_flight < function.provisioned:
+            function.provisioned_invocations += 1
+        elif function.reserved is None:
+            self.__unreserved_in_flight += 1
+        function.in_flight += 1
+        function.invocations += 1
+        function.peak_in_flight = max(function.peak_in_flight, function.in_flight)
+        return True
+
+    def release(self, name: str):
+        function = self.functions[name]
+        if function.reserved is None and function.in_flight > function.provisioned:
+            self.__unreserved_in_flight -= 1
+        function.in_flight -= 1
+
+    def get_function_concurrency(self, name: str) -> FunctionConcurrency:
+        return self.__get(name)
+
+    def get_account_concurrency(self) -> AccountConcurrency:
+        return AccountConcurrency(
+            limit=self.account_limit,
+            unreserved_limit=self.unreserved_limit,
+            in_flight=sum(f.in_flight for f in self.functions.values()),
+            unreserved_in_flight=self.__unreserved_in_flight,
+            throttles=sum(f.throttles for f in self.functions.values()),
+        )
@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import dataclasses
+import importlib
+import json
+import logging
+import math
+import os
+import signal
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.kinesis_lambda_simulator import KinesisLambdaSimulator, LambdaKinesisFunc, ShardState
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
+from py_lambda_simulator.sqs_transport import BotoSqsTransport
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# function name -> metric -> value
+Metrics = Dict[str, Dict[str, float]]
+
+
+@dataclass
+class Lease:
+    resource: str
+    worker: str
+    expires_at: float
+
+
+@dataclass
+class WorkerInfo:
+    worker_id: str
+    resources: List[str]
+    last_seen: float
+
+
+def _sqs_resource(name: str, slot: int) -> str:
+    return f"sqs/{name}/{slot}"
+
+
+def _kinesis_resource(name: str, shard_id: str) -> str:
+    return f"kinesis/{name}/{shard_id}"
+
+
+class Coordinator:
+    """
+    Hands out leases on function slots and stream shards to workers in other processes and aggregates their metrics.
+
+    Workers talk to it over TCP, one JSON object per line. Every heartbeat renews the worker's leases and rebalances
+    them so each live worker holds an even share, a worker that misses heartbeats for lease_seconds loses its leases
+    to the others.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, lease_seconds: float = 10.0):
+        self.host = host
+        # Port 0 binds a free port, the bound port is available here once started.
+        self.port = port
+        self.lease_seconds = lease_seconds
+        self.leases: Dict[str, Lease] = {}
+        self.workers: Dict[str, WorkerInfo] = {}
+        # Kept after workers leave, so the totals cover every worker that ever ran.
+        self.worker_metrics: Dict[str, Metrics] = {}
+        # Kinesis sequence numbers by shard resource, handed to whoever holds the shard next.
+        self.checkpoints: Dict[str, str] = {}
+        self.__server: Optional[asyncio.AbstractServer] = None
+        self.__writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self):
+        self.__server = await asyncio.start_server(self.__handle, self.host, self.port)
+        self.port = self.__server.sockets[0].getsockname()[1]
+        logger.info(f"Coordinator listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self.__server is not None:
+            self.__server.close()
+            # Worker connections stay open until the worker leaves, and from Python 3.12.1 wait_closed waits for them.
+            for writer in list(self.__writers):
+                writer.close()
+            await self.__server.wait_closed()
+            self.__server = None
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.__writers.add(writer)
+        try:
+            line = await reader.readline()
+            while line:
+                writer.write(json.dumps(self.handle_request(json.loads(line))).encode("utf-8") + b"\n")
+                await writer.drain()
+                line = await reader.readline()
+        except ConnectionError:
+            pass
+        finally:
+            self.__writers.discard(writer)
+            writer.close()
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        operation = request.get("op")
+        if operation == "heartbeat":
+            return {"leases": self.__heartbeat(request)}
+        if operation == "leave":
+            self.__leave(request)
+            return {}
+        if operation == "metrics":
+            return self.get_metrics()
+        return {"error": f"Unknown operation {operation}."}
+
+    def __heartbeat(self, request: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        now = time.monotonic()
+        worker_id = request["worker"]
+        self.__expire(now)
+        self.__save(worker_id, request)
+        self.workers[worker_id] = WorkerInfo(worker_id=worker_id, resources=request["resources"], last_seen=now)
+
+        resources = {resource for worker in self.workers.values() for resource in worker.resources}
+        share = math.ceil(len(resources) / len(self.workers))
+        held = sorted(resource for resource, lease in self.leases.items() if lease.worker == worker_id)
+        # Leases beyond the worker's share are freed for workers that joined since, they pick them up on their next
+        # heartbeat.
+        for resource in held[share:]:
+            del self.leases[resource]
+        held = held[:share]
+        for resource in request["resources"]:
+            if len(held) >= share:
+                break
+            if resource not in self.leases:
+                held.append(resource)
+
+        for resource in held:
+            self.leases[resource] = Lease(resource=resource, worker=worker_id, expires_at=now + self.lease_seconds)
+        return {resource: self.checkpoints.get(resource) for resource in held}
+
+    def __leave(self, request: Dict[str, Any]):
+        worker_id = request["worker"]
+        self.__save(worker_id, request)
+        self.workers.pop(worker_id, None)
+        for resource in [resource for resource, lease in self.leases.items() if lease.worker == worker_id]:
+            del self.leases[resource]
+
+    def __save(self, worker_id: str, request: Dict[str, Any]):
+        # Only the current holder of a shard may move its checkpoint.
+        for resource, checkpoint in request.get("checkpoints", {}).items():
+            lease = self.leases.get(resource)
+            if lease is not None and lease.worker == worker_id:
+                self.checkpoints[resource] = checkpoint
+        if "metrics" in request:
+            self.worker_metrics[worker_id] = request["metrics"]
+
+    def __expire(self, now: float):
+        for worker_id in [w.worker_id for w in self.workers.values() if now - w.last_seen > self.lease_seconds]:
+            logger.info(f"Worker {worker_id} missed its heartbeats, releasing its leases")
+            del self.workers[worker_id]
+        for resource in [resource for resource, lease in self.leases.items() if lease.expires_at < now]:
+            del self.leases[resource]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        totals: Metrics = {}
+        for metrics in self.worker_metrics.values():
+            for function, values in metrics.items():
+                function_totals = totals.setdefault(function, {})
+                for name, value in values.items():
+                    function_totals[name] = function_totals.get(name, 0) + value
+        return {
+            "functions": totals,
+            "workers": self.worker_metrics,
+            "leases": {resource: lease.worker for resource, lease in self.leases.items()},
+        }
+
+
+class DistributedWorker:
+    """
+    Runs the functions it holds leases for, against a backend shared with the other workers such as a moto server.
+
+    An SQS function is split into maximum_concurrency slots, a worker runs as many concurrent pollers as it holds
+    slots. A Kinesis function is split by shard, its checkpoints move with the shard's lease. Every worker is given
+    the same functions.
+    """
+
+    def __init__(
+        self,
+        coordinator_address: str,
+        funcs: List[Union[LambdaSqsFunc, LambdaKinesisFunc]],
+        endpoint_url: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        heartbeat_seconds: float = 1.0,
+    ):
+        # Leases are kept in wall clock time, so workers always run on the real clock.
+        self.coordinator_address = coordinator_address
+        self.funcs = {func.name: func for func in funcs}
+        self.endpoint_url = endpoint_url
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.governor = governor or ConcurrencyGovernor()
+        self.heartbeat_seconds = heartbeat_seconds
+        self.sqs = SqsLambdaSimulator(governor=self.governor, transport=BotoSqsTransport(endpoint_url=endpoint_url))
+        self.kinesis = KinesisLambdaSimulator(governor=self.governor, endpoint_url=endpoint_url)
+        self.kinesis.shard_filter = lambda name, shard_id: _kinesis_resource(name, shard_id) in self.leases
+        # resource -> checkpoint the coordinator handed over with it
+        self.leases: Dict[str, Optional[str]] = {}
+        self.__resources: List[str] = []
+        self.__tasks: List[asyncio.Task] = []
+        self.__stopping: Optional[asyncio.Event] = None
+        self.__lock: Optional[asyncio.Lock] = None
+        self.__reader: Optional[asyncio.StreamReader] = None
+        self.__writer: Optional[asyncio.StreamWriter] = None
+
+    async def start(self):
+        # Returns once the first leases are applied, the simulators and heartbeats keep running until stop.
+        self.__stopping = asyncio.Event()
+        self.__lock = asyncio.Lock()
+        self.__resources = await self.__list_resources()
+        await self.__heartbeat()
+        self.__tasks = [
+            asyncio.ensure_future(self.sqs.start()),
+            asyncio.ensure_future(self.kinesis.start()),
+            asyncio.ensure_future(self.__heartbeat_loop()),
+        ]
+        await asyncio.gather(self.sqs.wait_until_ready(), self.kinesis.wait_until_ready())
+
+    async def stop(self, drain_timeout: Optional[float] = None):
+        self.__stopping.set()
+        self.sqs.stop(drain_timeout)
+        self.kinesis.stop(drain_timeout)
+        try:
+            await asyncio.gather(*self.__tasks)
+        finally:
+            try:
+                await self.__request({"op": "leave", **self.__report()})
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                logger.info(f"Could not leave coordinator {self.coordinator_address}: {e!r}")
+            self.__disconnect()
+
+    async def __list_resources(self) -> List[str]:
+        resources = []
+        for name, func in self.funcs.items():
+            if isinstance(func, LambdaSqsFunc):
+                resources += [_sqs_resource(name, slot) for slot in range(func.maximum_concurrency)]
+            else:
+                shards = await asyncio.get_running_loop().run_in_executor(None, self.__list_shards, func.stream_name)
+                resources += [_kinesis_resource(name, shard_id) for shard_id in shards]
+        return resources
+
+    def __list_shards(self, stream_name: str) -> List[str]:
+        import boto3
+
+        client = boto3.client("kinesis", endpoint_url=self.endpoint_url)
+        return [
+            shard["ShardId"] for shard in client.describe_stream(StreamName=stream_name)["StreamDescription"]["Shards"]
+        ]
+
+    async def __heartbeat_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.__stopping.wait(), self.heartbeat_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.__heartbeat()
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                # Another worker takes over once the leases expire, stop consuming before that happens.
+                logger.info(f"Lost coordinator {self.coordinator_address}: {e!r}, releasing leases")
+                self.__disconnect()
+                self.__apply({})
+
+    async def __heartbeat(self):
+        response = await self.__request({"op": "heartbeat", "resources": self.__resources, **self.__report()})
+        self.__apply(response["leases"])
+
+    def __report(self) -> Dict[str, Any]:
+        checkpoints = {}
+        for name, shards in self.kinesis.shards.items():
+            for shard_id, state in shards.items():
+                resource = _kinesis_resource(name, shard_id)
+                if resource in self.leases and state.checkpoint is not None:
+                    checkpoints[resource] = state.checkpoint
+        return {"worker": self.worker_id, "checkpoints": checkpoints, "metrics": self.collect_metrics()}
+
+    def collect_metrics(self) -> Metrics:
+        metrics = {}
+        for name in self.funcs:
+            concurrency = self.governor.get_function_concurrency(name)
+            values = {"invocations": concurrency.invocations, "throttles": concurrency.throttles}
+            shards = self.kinesis.shards.get(name, {}).values()
+            if shards:
+                values["records"] = sum(state.records for state in shards)
+                values["errors"] = sum(state.error_count for state in shards)
+                values["dropped_records"] = sum(state.dropped_records for state in shards)
+            metrics[name] = values
+        return metrics
+
+    def __apply(self, leases: Dict[str, Optional[str]]):
+        previous = self.leases
+        self.leases = leases
+        for name, func in self.funcs.items():
+            if isinstance(func, LambdaSqsFunc):
+                slots = sum(1 for slot in range(func.maximum_concurrency) if _sqs_resource(name, slot) in leases)
+                current = self.sqs.funcs.get(name)
+                if (current.maximum_concurrency if current else 0) == slots:
+                    continue
+                # Invocations already running finish, the poller uses the new copy from its next round.
+                if current is not None:
+                    self.sqs.remove_func(name)
+                if slots:
+                    self.sqs.add_func(dataclasses.replace(func, maximum_concurrency=slots))
+            else:
+                prefix = _kinesis_resource(name, "")
+                held = {resource for resource in leases if resource.startswith(prefix)}
+                if held == {resource for resource in previous if resource.startswith(prefix)}:
+                    continue
+                for resource in held - set(previous):
+                    if leases[resource] is not None:
+                        shard_id = resource[len(prefix) :]
+                        state = self.kinesis.shards.setdefault(name, {}).setdefault(shard_id, ShardState(shard_id))
+                        state.checkpoint = leases[resource]
+                # A fresh copy restarts the consumers, which reopen the held shards from their checkpoints.
+                if name in self.kinesis.funcs:
+                    self.kinesis.remove_func(name)
+                if held:
+                    self.kinesis.add_func(dataclasses.replace(func))
+
+    async def __request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.__lock:
+            if self.__writer is None:
+                host, port = self.coordinator_address.rsplit(":", 1)
+                self.__reader, self.__writer = await asyncio.open_connection(host, int(port))
+            self.__writer.write(json.dumps(request).encode("utf-8") + b"\n")
+            await self.__writer.drain()
+            line = await self.__reader.readline()
+            if not line:
+                raise ConnectionError("Coordinator closed the connection")
+            return json.loads(line)
+
+    def __disconnect(self):
+        if self.__writer is not None:
+            self.__writer.close()
+        self.__reader = None
+        self.__writer = None
+
+
+def _load_funcs(reference: str) -> List[Union[LambdaSqsFunc, LambdaKinesisFunc]]:
+    module_name, attribute = reference.split(":", 1)
+    funcs = getattr(importlib.import_module(module_name), attribute)
+    return funcs() if callable(funcs) else funcs
+
+
+async def _run_until_signalled(start: Callable[[], Awaitable], stop: Callable[[], Awaitable]):
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    await start()
+    await stopping.wait()
+    await stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run simulator workers across processes against a shared backend.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    coordinator_parser = commands.add_parser("coordinator", help="hand out leases and aggregate metrics")
+    coordinator_parser.add_argument("--host", default="127.0.0.1")
+    coordinator_parser.add_argument("--port", type=int, default=7400)
+    coordinator_parser.add_argument("--lease-seconds", type=float, default=10.0)
+    worker_parser = commands.add_parser("worker", help="run the functions this worker holds leases for")
+    worker_parser.add_argument("--coordinator", required=True, help="host:port of the coordinator")
+    worker_parser.add_argument(
+        "--funcs", required=True, help="module:attribute holding a list of functions, or a callable returning one"
+    )
+    worker_parser.add_argument("--endpoint-url", help="shared AWS endpoint, e.g. a moto server")
+    worker_parser.add_argument("--worker-id")
+    worker_parser.add_argument("--heartbeat-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "coordinator":
+        coordinator = Coordinator(host=args.host, port=args.port, lease_seconds=args.lease_seconds)
+
+        async def stop_coordinator():
+            await coordinator.stop()
+            print(json.dumps(coordinator.get_metrics()))
+
+        asyncio.run(_run_until_signalled(coordinator.start, stop_coordinator))
+    else:
+        worker = DistributedWorker(
+            args.coordinator,
+            _load_funcs(args.funcs),
+            endpoint_url=args.endpoint_url,
+            worker_id=args.worker_id,
+            heartbeat_seconds=args.heartbeat_seconds,
+        )
+        asyncio.run(_run_until_signalled(worker.start, worker.stop))
+
+
+if __name__ == "__main__":
+    main()
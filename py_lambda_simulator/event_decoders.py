@@ -0,0 +1,260 @@
+import dataclasses
+import itertools
+import json
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+T = TypeVar("T")
+
+_DECODERS: Dict[Tuple[type, bool], Callable[[Dict], Any]] = {}
+_ENCODERS: Dict[type, Callable[[Any], Dict]] = {}
+# Lazy subclasses generated by the decoders, mapped to the event class they stand in for.
+_LAZY_BASES: Dict[type, type] = {}
+_names = itertools.count()
+
+
+def is_typeddict(cls: Any) -> bool:
+    return isinstance(cls, type) and issubclass(cls, dict) and hasattr(cls, "__total__")
+
+
+def _is_event_class(cls: Any) -> bool:
+    return (isinstance(cls, type) and dataclasses.is_dataclass(cls)) or is_typeddict(cls)
+
+
+def _ref(namespace: Dict[str, Any], value: Any) -> str:
+    name = f"_ref{next(_names)}"
+    namespace[name] = value
+    return name
+
+
+def _convert_expr(
+    tp: Any, value: str, namespace: Dict[str, Any], converter: Callable[[type], Callable], depth: int = 0
+) -> Optional[str]:
+    # An expression that decodes or encodes value, None when the value is used as is. Plain values are never
+    # copied, only fields holding other event classes, or lists and dicts of them, are converted.
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if origin is Union:
+        not_none = [arg for arg in args if arg is not type(None)]
+        if len(not_none) != 1:
+            return None
+        inner = _convert_expr(not_none[0], value, namespace, converter, depth)
+        return f"(None if {value} is None else {inner})" if inner else None
+    if origin is list and args:
+        item = f"_v{depth}"
+        inner = _convert_expr(args[0], item, namespace, converter, depth + 1)
+        return f"[{inner} for {item} in {value}]" if inner else None
+    if origin is dict and len(args) == 2:
+        key, item = f"_k{depth}", f"_v{depth}"
+        inner = _convert_expr(args[1], item, namespace, converter, depth + 1)
+        return f"{{{key}: {inner} for {key}, {item} in {value}.items()}}" if inner else None
+    if _is_event_class(tp):
+        return f"{_ref(namespace, converter(tp))}({value})"
+    return None
+
+
+def _compile(name: str, lines: List[str], namespace: Dict[str, Any]) -> Callable:
+    exec(f"def {name}(data):\n" + "\n".join(f"    {line}" for line in lines), namespace)
+    return namespace[name]
+
+
+def _required_keys(cls: type) -> set:
+    if hasattr(cls, "__required_keys__"):
+        return set(cls.__required_keys__)
+    return set(get_type_hints(cls)) if cls.__total__ else set()
+
+
+def _typeddict_lines(cls: type, namespace: Dict[str, Any], converter: Callable[[type], Callable]) -> List[str]:
+    required = _required_keys(cls)
+    lines = ["out = {}"]
+    for key, tp in get_type_hints(cls).items():
+        expr = _convert_expr(tp, "value", namespace, converter) or "value"
+        if key in required:
+            lines += [f"value = data[{key!r}]", f"out[{key!r}] = {expr}"]
+        else:
+            lines += [f"if {key!r} in data:", f"    value = data[{key!r}]", f"    out[{key!r}] = {expr}"]
+    return lines + ["return out"]
+
+
+def _dataclass_lines(cls: type, namespace: Dict[str, Any], lazy: bool) -> List[str]:
+    hints = get_type_hints(cls)
+    decoder = lambda tp: get_decoder(tp, lazy)
+    # Going through __init__ keeps __post_init__ and frozen dataclasses working, everything else gets its fields
+    # set directly, which skips the argument handling of __init__.
+    use_init = hasattr(cls, "__post_init__") or cls.__dataclass_params__.frozen
+    lazy_cls = None if use_init or not lazy else _lazy_class(cls)
+
+    lines = [] if use_init else [f"obj = {_ref(namespace, object.__new__)}({_ref(namespace, lazy_cls or cls)})"]
+    arguments = []
+    for f in dataclasses.fields(cls):
+        if not f.init:
+            if not use_init:
+                default = f.default if f.default is not dataclasses.MISSING else None
+                lines.append(f"obj.{f.name} = {_ref(namespace, default)}")
+            continue
+
+        tp = hints[f.name]
+        if f.default is not dataclasses.MISSING:
+            lines.append(f"value = data.get({f.name!r}, {_ref(namespace, f.default)})")
+        elif f.default_factory is not dataclasses.MISSING:
+            lines.append(f"value = data[{f.name!r}] if {f.name!r} in data else {_ref(namespace, f.default_factory)}()")
+        elif get_origin(tp) is Union and type(None) in get_args(tp):
+            lines.append(f"value = data.get({f.name!r})")
+        else:
+            lines.append(f"value = data[{f.name!r}]")
+
+        expr = _convert_expr(tp, "value", namespace, decoder)
+        if use_init:
+            lines.append(f"_{f.name} = {expr or 'value'}")
+            arguments.append(f"{f.name}=_{f.name}")
+        elif expr and lazy_cls is not None:
+            lines += ["if value is None:", f"    obj.{f.name} = None", "else:", f"    obj._raw_{f.name} = value"]
+        else:
+            lines.append(f"obj.{f.name} = {expr or 'value'}")
+
+    if use_init:
+        return lines + [f"return {_ref(namespace, cls)}({', '.join(arguments)})"]
+    return lines + ["return obj"]
+
+
+def _lazy_class(cls: type) -> Optional[type]:
+    """
+    A subclass of a slotted event class whose nested events stay raw until they are first read.
+
+    Every nested field gets a raw slot and a property. The property decodes the raw value once and stores the result
+    in the slot of the event class, from then on a read costs little more than a plain slot access.
+    """
+    if "__slots__" not in cls.__dict__:
+        return None
+    namespace: Dict[str, Any] = {}
+    hints = get_type_hints(cls)
+    decoders = {}
+    for f in dataclasses.fields(cls):
+        expr = _convert_expr(hints[f.name], "value", namespace, lambda tp: get_decoder(tp, True)) if f.init else None
+        if expr:
+            decoders[f.name] = eval(f"lambda value: {expr}", namespace)
+    if not decoders:
+        return None
+
+    names = [f.name for f in dataclasses.fields(cls)]
+    lazy_cls = type(
+        cls.__name__,
+        (cls,),
+        {
+            "__slots__": tuple(f"_raw_{name}" for name in decoders),
+            "__qualname__": cls.__qualname__,
+            "__module__": cls.__module__,
+            "__eq__": _lazy_eq(cls),
+            # Pickles and copies as the event class itself, with every field decoded.
+            "__reduce__": lambda self: (_rebuild, (cls, {name: getattr(self, name) for name in names})),
+        },
+    )
+    for name, decode_field in decoders.items():
+        setattr(lazy_cls, name, _lazy_property(cls.__dict__[name], lazy_cls.__dict__[f"_raw_{name}"], decode_field))
+    _LAZY_BASES[lazy_cls] = cls
+    return lazy_cls
+
+
+def _lazy_property(slot: Any, raw_slot: Any, decode_field: Callable[[Any], Any]) -> property:
+    def get(self):
+        try:
+            return slot.__get__(self)
+        except AttributeError:
+            value = decode_field(raw_slot.__get__(self))
+            slot.__set__(self, value)
+            return value
+
+    def set(self, value):
+        slot.__set__(self, value)
+
+    return property(get, set)
+
+
+def _lazy_eq(cls: type) -> Callable[[Any, Any], Any]:
+    # The dataclass __eq__ only compares instances of the exact same class, this lets lazy and eager instances of
+    # the same event compare equal.
+    names = [f.name for f in dataclasses.fields(cls) if f.compare]
+
+    def eq(self, other):
+        if not isinstance(other, cls):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in names)
+
+    return eq
+
+
+def _rebuild(cls: type, values: Dict[str, Any]) -> Any:
+    obj = object.__new__(cls)
+    for name, value in values.items():
+        object.__setattr__(obj, name, value)
+    return obj
+
+
+def get_decoder(cls: Type[T], lazy: bool = False) -> Callable[[Dict], T]:
+    """Returns a decoder specialized for cls, generated on first use. Keys that are not fields are ignored."""
+    key = (cls, lazy)
+    if key not in _DECODERS:
+        namespace: Dict[str, Any] = {}
+        if is_typeddict(cls):
+            lines = _typeddict_lines(cls, namespace, lambda tp: get_decoder(tp, lazy))
+        elif _is_event_class(cls):
+            lines = _dataclass_lines(cls, namespace, lazy)
+        else:
+            raise Exception(f"Cannot decode {cls}, only dataclasses and TypedDicts are supported.")
+        lines = ["try:"] + [f"    {line}" for line in lines]
+        lines += [
+            "except KeyError as e:",
+            f"    raise Exception(f'Missing field {{e.args[0]}} decoding {cls.__name__}') from None",
+        ]
+        _DECODERS[key] = _compile(f"decode_{cls.__name__}", lines, namespace)
+    return _DECODERS[key]
+
+
+def get_encoder(cls: Type[T]) -> Callable[[T], Dict]:
+    """Returns an encoder specialized for cls, turning events back into the dicts they are decoded from."""
+    if cls not in _ENCODERS:
+        namespace: Dict[str, Any] = {}
+        if is_typeddict(cls):
+            lines = _typeddict_lines(cls, namespace, get_encoder)
+        elif _is_event_class(cls):
+            hints = get_type_hints(cls)
+            items = []
+            for f in dataclasses.fields(cls):
+                value = f"data.{f.name}"
+                items.append(f"{f.name!r}: {_convert_expr(hints[f.name], value, namespace, get_encoder) or value}")
+            lines = ["return {" + ", ".join(items) + "}"]
+        else:
+            raise Exception(f"Cannot encode {cls}, only dataclasses and TypedDicts are supported.")
+        _ENCODERS[cls] = _compile(f"encode_{cls.__name__}", lines, namespace)
+    return _ENCODERS[cls]
+
+
+def decode(cls: Type[T], data: Union[Dict, str, bytes], lazy: bool = False) -> T:
+    if isinstance(data, (str, bytes, bytearray)):
+        data = json.loads(data)
+    return get_decoder(cls, lazy)(data)
+
+
+def encode(event: Any, cls: Optional[type] = None) -> Dict:
+    # TypedDict events are plain dicts at runtime, so their class has to be passed in.
+    if cls is None:
+        if isinstance(event, dict):
+            raise Exception("Pass the TypedDict class to encode a dict event.")
+        cls = _LAZY_BASES.get(type(event), type(event))
+    return get_encoder(cls)(event)
+
+
+def encode_json(event: Any, cls: Optional[type] = None) -> bytes:
+    return json.dumps(encode(event, cls), separators=(",", ":")).encode("utf-8")
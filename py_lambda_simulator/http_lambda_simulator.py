@@ -1,11 +1,18 @@
+import asyncio
 import logging
 from dataclasses import dataclass
-from typing import Callable, Any, Dict, Literal, Union
+from typing import Callable, Any, Dict, Literal, Union, Optional
 
 from aiohttp import web
 
+from py_lambda_simulator.clock import Clock, RealClock
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.invocation import invoke_handler
 from py_lambda_simulator.lambda_config import LambdaConfig
 from py_lambda_simulator.lambda_events import RequestContext, ApiGatewayProxyEvent
+from py_lambda_simulator.lifecycle import LifecycleTimings
+from py_lambda_simulator.recording import InvocationRecorder
+from py_lambda_simulator.tracing import TRACE_HEADER, SpanCollector, parse_trace_header
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,11 +33,30 @@ class LambdaHttpFunc(LambdaConfig):
 
 
 class HttpLambdaSimulator:
-    def __init__(self):
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        host: str = "localhost",
+        port: int = 8080,
+        recorder: Optional[InvocationRecorder] = None,
+        span_collector: Optional[SpanCollector] = None,
+    ):
         self.app = web.Application()
         self.runner = None
+        self.site = None
+        # Port 0 binds a free port, the bound port is available here once started.
+        self.host = host
+        self.port = port
+        self.lifecycle = LifecycleTimings()
+        self.recorder = recorder
+        self.span_collector = span_collector
+        self.__in_flight = 0
+        self.__idle: Optional[asyncio.Event] = None
         self.funcs: Dict[str, Union[LambdaHttpFunc, LambdaPureHttpFunc]] = {}
         self.is_started = False
+        self.clock = clock or RealClock()
+        self.governor = governor or ConcurrencyGovernor()
 
     def add_func(self, func: Union[LambdaHttpFunc, LambdaPureHttpFunc]):
         self.funcs[func.name] = func
@@ -39,6 +65,7 @@ class HttpLambdaSimulator:
         self.funcs.pop(name)
 
     async def start(self):
+        self.lifecycle = LifecycleTimings(start_requested_at=LifecycleTimings.now())
         for func in self.funcs.values():
             logger.info(f"Adding func {func}")
 
@@ -49,6 +76,29 @@ class HttpLambdaSimulator:
                     else:
                         body = None
 
+                    if not self.governor.try_acquire(f.name):
+                        return web.json_response(
+                            {"message": "Rate Exceeded."},
+                            status=429,
+                            headers={"x-amzn-ErrorType": "TooManyRequestsException"},
+                        )
+                    self.__in_flight += 1
+                    self.__get_idle().clear()
+                    # Shielded, the handler thread cannot be interrupted and an abandoned request must not wait for it.
+                    return await asyncio.shield(asyncio.ensure_future(run(request, body)))
+
+                async def run(request, body):
+                    try:
+                        return await invoke(request, body)
+                    finally:
+                        self.governor.release(f.name)
+                        self.__in_flight -= 1
+                        if self.__in_flight == 0:
+                            self.__get_idle().set()
+
+                async def invoke(request, body):
+                    # Requests that carry a trace header continue that trace, others start a new one.
+                    parent = parse_trace_header(request.headers.get(TRACE_HEADER))
                     if type(f) == LambdaHttpFunc:
                         event = ApiGatewayProxyEvent(
                             body=body,
@@ -70,14 +120,16 @@ class HttpLambdaSimulator:
                             httpMethod=request.method,
                             stageVariables={},
                         )
-                        lambda_response = f.handler_func(event, {})
+                        lambda_response = await invoke_handler(
+                            self.clock, "http", f, event, self.recorder, self.span_collector, parent
+                        )
                         return web.Response(
                             status=lambda_response["statusCode"],
                             headers=lambda_response.get("headers"),
                             body=lambda_response.get("body"),
                         )
                     elif type(f) == LambdaPureHttpFunc:
-                        f.handler_func({}, {})
+                        await invoke_handler(self.clock, "http", f, {}, self.recorder, self.span_collector, parent)
                         return web.Response(status=200)
 
                 if func.method == "GET":
@@ -89,11 +141,45 @@ class HttpLambdaSimulator:
             add(func)
             self.app.router._frozen = True
 
-        self.runner = web.AppRunner(self.app)
-        await self.runner.setup()
-        site = web.TCPSite(self.runner, "localhost", 8080)
-        await site.start()
-
-    async def stop(self):
-        await self.app.shutdown()
+        # stop drains in-flight requests itself, whatever is left once cleanup runs is abandoned right away.
+        runner = self.runner = web.AppRunner(self.app, shutdown_timeout=0.1)
+        await runner.setup()
+        self.site = web.TCPSite(runner, self.host, self.port)
+        try:
+            await self.site.start()
+        except BaseException:
+            await runner.cleanup()
+            self.runner = None
+            self.site = None
+            raise
+        if runner.addresses:
+            self.port = runner.addresses[0][1]
+        self.is_started = True
+        self.lifecycle.ready_at = LifecycleTimings.now()
+
+    def __get_idle(self) -> asyncio.Event:
+        if self.__idle is None:
+            self.__idle = asyncio.Event()
+            self.__idle.set()
+        return self.__idle
+
+    async def stop(self, drain_timeout: Optional[float] = None):
+        if self.runner is None:
+            return
+        self.lifecycle.stop_requested_at = LifecycleTimings.now()
+        self.is_started = False
+        # Stop accepting connections first, then let in-flight requests finish before tearing the app down.
+        # From aiohttp 3.9 stopping a site only closes its listener, the app is shut down once by cleanup.
+        if self.site is not None:
+            await self.site.stop()
+        in_flight = self.__in_flight
+        try:
+            await asyncio.wait_for(self.__get_idle().wait(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.info(f"Abandoning {self.__in_flight} requests after drain timeout")
+        self.lifecycle.abandoned_invocations = self.__in_flight
+        self.lifecycle.drained_invocations = in_flight - self.__in_flight
         await self.runner.cleanup()
+        self.runner = None
+        self.site = None
+        self.lifecycle.stopped_at = LifecycleTimings.now()
@@ -0,0 +1,51 @@
+import sys
+import time
+from typing import Any, Optional
+
+from py_lambda_simulator.clock import Clock
+from py_lambda_simulator.recording import InvocationRecorder
+from py_lambda_simulator.tracing import (
+    SpanCollector,
+    TraceContext,
+    finish_span,
+    instrument_botocore,
+    start_span,
+    uninstrument_botocore,
+)
+
+
+async def invoke_handler(
+    clock: Clock,
+    source: str,
+    func: Any,
+    event: Any,
+    recorder: Optional[InvocationRecorder] = None,
+    span_collector: Optional[SpanCollector] = None,
+    parent: Optional[TraceContext] = None,
+    queue_wait: Optional[float] = None,
+) -> Any:
+    started_at = clock.time()
+    started = time.perf_counter()
+    response = None
+    error = None
+    span = token = None
+    # botocore is only patched while traced invocations run, and only once a handler has imported it.
+    instrumented = span_collector is not None and "botocore" in sys.modules
+    if span_collector is not None:
+        span, token = start_span(func.name, source, parent, started_at, queue_wait)
+    if instrumented:
+        instrument_botocore()
+    try:
+        response = await clock.run_in_thread(func.handler_func, event, {})
+        return response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        if instrumented:
+            uninstrument_botocore()
+        if span is not None:
+            finish_span(span_collector, span, token, duration, error)
+        if recorder is not None:
+            recorder.record(source, func.name, started_at, event, response, duration, error)
@@ -0,0 +1,343 @@
+import asyncio
+import base64
+import logging
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Any, Dict, List, Literal, Optional, Set, Tuple
+
+from py_lambda_simulator.clock import Clock, RealClock
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.invocation import invoke_handler
+from py_lambda_simulator.lambda_config import LambdaConfig
+from py_lambda_simulator.lambda_events import KinesisData, KinesisEvent, KinesisRecord
+from py_lambda_simulator.lifecycle import LifecycleTimings
+from py_lambda_simulator.recording import InvocationRecorder
+from py_lambda_simulator.tracing import SpanCollector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# GetRecords returns at most 10000 records per call.
+_MAX_GET_RECORDS = 10000
+
+
+@dataclass
+class LambdaKinesisFunc(LambdaConfig):
+    stream_name: str
+    handler_func: Callable[[KinesisEvent, Any], None]
+    batch_size: int = 100
+    # Batches processed concurrently per shard. Records with the same partition key always share a lane and stay
+    # in order.
+    parallelization_factor: int = 1
+    starting_position: Literal["TRIM_HORIZON", "LATEST"] = "LATEST"
+    bisect_batch_on_function_error: bool = False
+    # -1 retries a failing batch until it succeeds, which holds up its shard the way it does in AWS.
+    maximum_retry_attempts: int = -1
+
+
+@dataclass
+class ShardState:
+    shard_id: str
+    # Sequence number of the last record processed, consumers resume after it when the simulator restarts.
+    checkpoint: Optional[str] = None
+    # Seconds between the newest record of the last batch arriving on the stream and its invocation.
+    iterator_age: float = 0.0
+    max_iterator_age: float = 0.0
+    records: int = 0
+    batches: int = 0
+    error_count: int = 0
+    bisect_count: int = 0
+    dropped_records: int = 0
+
+
+class KinesisLambdaSimulator:
+    """
+    Reads every shard of a stream with its own consumer, the way Lambda's event source mappings do.
+
+    A consumer fetches up to batch_size * parallelization_factor records, spreads them over lanes by partition key
+    and invokes the lanes concurrently. The shard is checkpointed once every lane finished its records.
+    """
+
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        recorder: Optional[InvocationRecorder] = None,
+        endpoint_url: Optional[str] = None,
+        span_collector: Optional[SpanCollector] = None,
+    ):
+        self.funcs: Dict[str, LambdaKinesisFunc] = {}
+        # function name -> shard id -> state
+        self.shards: Dict[str, Dict[str, ShardState]] = {}
+        self.clock = clock or RealClock()
+        self.governor = governor or ConcurrencyGovernor()
+        self.recorder = recorder
+        self.endpoint_url = endpoint_url
+        self.span_collector = span_collector
+        self.is_started = False
+        self.poll_interval_seconds = 1
+        self.retry_backoff_seconds = 1
+        self.throttle_backoff_seconds = 1
+        # Called with function name and shard id, only shards it accepts are consumed. Lets several simulators split
+        # the shards of a stream between them.
+        self.shard_filter: Optional[Callable[[str, str], bool]] = None
+        self.__client = None
+        self.__consumers: Dict[str, Tuple[LambdaKinesisFunc, asyncio.Task]] = {}
+        self.__processing: Set[asyncio.Task] = set()
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__wakeup: Optional[asyncio.Event] = None
+        self.__stopping: Optional[asyncio.Event] = None
+        self.__ready: Optional[asyncio.Event] = None
+        self.__drain_timeout: Optional[float] = None
+        self.lifecycle = LifecycleTimings()
+
+    def add_func(self, func: LambdaKinesisFunc):
+        if func.name in self.funcs:
+            raise Exception(f"Function with name {func.name} already added.")
+        if not 1 <= func.parallelization_factor <= 10:
+            raise Exception(f"Parallelization factor of {func.name} must be between 1 and 10.")
+        if not 1 <= func.batch_size <= _MAX_GET_RECORDS:
+            raise Exception(f"Batch size of {func.name} must be between 1 and {_MAX_GET_RECORDS}.")
+        self.funcs[func.name] = func
+        self.shards.setdefault(func.name, {})
+        self.__wake()
+
+    def remove_func(self, name: str):
+        # Its consumers stop after the batch they are processing, checkpoints are kept for when it is added again.
+        self.funcs.pop(name)
+
+    def get_iterator_age(self, name: str) -> float:
+        return max((state.iterator_age for state in self.shards.get(name, {}).values()), default=0.0)
+
+    def get_max_iterator_age(self, name: str) -> float:
+        return max((state.max_iterator_age for state in self.shards.get(name, {}).values()), default=0.0)
+
+    def __wake(self):
+        if self.__loop is not None and not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(self.__wakeup.set)
+
+    async def wait_until_ready(self):
+        await self.__get_ready().wait()
+
+    def __get_ready(self) -> asyncio.Event:
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
+        return self.__ready
+
+    async def start(self):
+        self.lifecycle = LifecycleTimings(start_requested_at=LifecycleTimings.now())
+        self.__loop = asyncio.get_running_loop()
+        self.__wakeup = asyncio.Event()
+        self.__stopping = asyncio.Event()
+        self.__drain_timeout = None
+        self.__consumers = {}
+        self.is_started = True
+        # Shard iterators are taken before the simulator reports ready, so a LATEST consumer sees every record put
+        # after start returns.
+        opened = {name: await self.__open_stream(func) for name, func in list(self.funcs.items())}
+        self.lifecycle.ready_at = LifecycleTimings.now()
+        self.__get_ready().set()
+
+        try:
+            while self.is_started:
+                self.__wakeup.clear()
+                for name, (func, task) in list(self.__consumers.items()):
+                    if task.done():
+                        # Surfaces errors reading the stream, e.g. when it does not exist.
+                        task.result()
+                        if self.funcs.get(name) is not func:
+                            del self.__consumers[name]
+                for name, func in list(self.funcs.items()):
+                    if name not in self.__consumers:
+                        task = asyncio.ensure_future(self.__consume_stream(func, opened.pop(name, None)))
+                        task.add_done_callback(lambda _: self.__wakeup.set())
+                        self.__consumers[name] = (func, task)
+                await self.__wakeup.wait()
+        finally:
+            self.is_started = False
+            self.__stopping.set()
+            await self.__drain()
+            self.__get_ready().clear()
+            self.lifecycle.stopped_at = LifecycleTimings.now()
+
+    async def __drain(self):
+        consumers = [task for _, task in self.__consumers.values()]
+        if not consumers:
+            return
+        processing = set(self.__processing)
+        _, pending = await asyncio.wait(consumers, timeout=self.__drain_timeout)
+        # Abandoned records were never checkpointed, the next start reads them again.
+        self.lifecycle.abandoned_invocations = len(self.__processing)
+        self.lifecycle.drained_invocations = len(processing - self.__processing)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def __get_client(self):
+        if self.__client is None:
+            import boto3
+
+            self.__client = boto3.client("kinesis", endpoint_url=self.endpoint_url)
+        return self.__client
+
+    async def __call(self, operation: str, **kwargs) -> Dict:
+        return await self.clock.run_in_thread(getattr(self.__get_client(), operation), **kwargs)
+
+    def __is_consuming(self, func: LambdaKinesisFunc) -> bool:
+        return self.is_started and self.funcs.get(func.name) is func
+
+    def __owns(self, func: LambdaKinesisFunc, shard_id: str) -> bool:
+        return self.shard_filter is None or self.shard_filter(func.name, shard_id)
+
+    async def __open_stream(self, func: LambdaKinesisFunc) -> List[Tuple[str, ShardState, str]]:
+        # Shards are listed once, streams resharded while the simulator runs are picked up on the next start.
+        stream = (await self.__call("describe_stream", StreamName=func.stream_name))["StreamDescription"]
+        shards = []
+        for shard in stream["Shards"]:
+            if not self.__owns(func, shard["ShardId"]):
+                continue
+            state = self.shards[func.name].setdefault(shard["ShardId"], ShardState(shard_id=shard["ShardId"]))
+            if state.checkpoint is not None:
+                position = {"ShardIteratorType": "AFTER_SEQUENCE_NUMBER", "StartingSequenceNumber": state.checkpoint}
+            else:
+                position = {"ShardIteratorType": func.starting_position}
+            response = await self.__call(
+                "get_shard_iterator", StreamName=func.stream_name, ShardId=state.shard_id, **position
+            )
+            shards.append((stream["StreamARN"], state, response["ShardIterator"]))
+        return shards
+
+    async def __consume_stream(
+        self, func: LambdaKinesisFunc, shards: Optional[List[Tuple[str, ShardState, str]]] = None
+    ):
+        if shards is None:
+            shards = await self.__open_stream(func)
+        await asyncio.gather(*(self.__consume_shard(func, *shard) for shard in shards))
+
+    async def __consume_shard(self, func: LambdaKinesisFunc, stream_arn: str, state: ShardState, iterator: str):
+        limit = min(func.batch_size * func.parallelization_factor, _MAX_GET_RECORDS)
+
+        while iterator is not None and self.__is_consuming(func) and self.__owns(func, state.shard_id):
+            response = await self.__call("get_records", ShardIterator=iterator, Limit=limit)
+            records = response["Records"]
+            if records:
+                if not await self.__process(func, stream_arn, state, records):
+                    return
+                state.checkpoint = records[-1]["SequenceNumber"]
+            else:
+                state.iterator_age = 0.0
+            iterator = response.get("NextShardIterator")
+            # A shard that is behind is read again right away, one that is caught up is polled once per interval.
+            if len(records) < limit and await self.clock.wait(self.__stopping, self.poll_interval_seconds):
+                return
+
+    async def __process(self, func: LambdaKinesisFunc, stream_arn: str, state: ShardState, records: List[Dict]):
+        lanes: Dict[int, List[Dict]] = defaultdict(list)
+        for record in records:
+            lanes[zlib.crc32(record["PartitionKey"].encode()) % func.parallelization_factor].append(record)
+
+        task = asyncio.current_task()
+        self.__processing.add(task)
+        try:
+            results = await asyncio.gather(
+                *(self.__process_lane(func, stream_arn, state, lane) for lane in lanes.values())
+            )
+        finally:
+            self.__processing.discard(task)
+        return all(results)
+
+    async def __process_lane(self, func: LambdaKinesisFunc, stream_arn: str, state: ShardState, records: List[Dict]):
+        for start in range(0, len(records), func.batch_size):
+            if not await self.__process_batch(func, stream_arn, state, records[start : start + func.batch_size]):
+                return False
+        return True
+
+    async def __process_batch(
+        self, func: LambdaKinesisFunc, stream_arn: str, state: ShardState, records: List[Dict]
+    ) -> bool:
+        # Returns False when the simulator stopped before the batch was done, so the shard is not checkpointed.
+        pending = [(records, 0)]
+        while pending:
+            batch, retries = pending.pop()
+            if not await self.__acquire(func):
+                return False
+            if await self.__invoke(func, stream_arn, state, batch):
+                continue
+
+            if func.bisect_batch_on_function_error and len(batch) > 1:
+                # Splitting does not count as a retry, the halves are processed in order.
+                state.bisect_count += 1
+                half = len(batch) // 2
+                pending += [(batch[half:], retries), (batch[:half], retries)]
+            elif func.maximum_retry_attempts != -1 and retries >= func.maximum_retry_attempts:
+                state.dropped_records += len(batch)
+                logger.info(
+                    f"Dropping {len(batch)} records of {state.shard_id} for {func.name} after {retries} retries"
+                )
+            else:
+                if await self.clock.wait(self.__stopping, self.retry_backoff_seconds):
+                    return False
+                pending.append((batch, retries + 1))
+        return True
+
+    async def __acquire(self, func: LambdaKinesisFunc) -> bool:
+        backoff = self.throttle_backoff_seconds
+        while not self.governor.try_acquire(func.name):
+            if await self.clock.wait(self.__stopping, backoff):
+                return False
+            backoff = min(backoff * 2, 60)
+        return True
+
+    async def __invoke(self, func: LambdaKinesisFunc, stream_arn: str, state: ShardState, records: List[Dict]) -> bool:
+        try:
+            # Arrival timestamps come from the stream, so the age is measured in wall clock time.
+            state.iterator_age = max(0.0, time.time() - records[-1]["ApproximateArrivalTimestamp"].timestamp())
+            state.max_iterator_age = max(state.max_iterator_age, state.iterator_age)
+            state.batches += 1
+            logger.info(f"Invoking {func.name}")
+            event = KinesisEvent(Records=[_to_event_record(func, stream_arn, state.shard_id, r) for r in records])
+            # Kinesis records carry no trace header, every batch starts a trace that waited its iterator age.
+            await invoke_handler(
+                self.clock, "kinesis", func, event, self.recorder, self.span_collector, queue_wait=state.iterator_age
+            )
+            state.records += len(records)
+            return True
+        except Exception:
+            state.error_count += 1
+            logger.exception(f"Kinesis invocation of {func.name} failed")
+            return False
+        finally:
+            self.governor.release(func.name)
+
+    def stop(self, drain_timeout: Optional[float] = None):
+        # Consumers finish the records they fetched, for at most drain_timeout seconds. Safe to call from a handler
+        # thread.
+        self.is_started = False
+        self.__drain_timeout = drain_timeout
+        if self.lifecycle.stop_requested_at is None:
+            self.lifecycle.stop_requested_at = LifecycleTimings.now()
+        if self.__loop is not None and not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(self.__stopping.set)
+        self.__wake()
+
+
+def _to_event_record(func: LambdaKinesisFunc, stream_arn: str, shard_id: str, record: Dict) -> KinesisRecord:
+    _, _, _, region, account, _ = stream_arn.split(":", 5)
+    return KinesisRecord(
+        kinesis=KinesisData(
+            kinesisSchemaVersion="1.0",
+            partitionKey=record["PartitionKey"],
+            sequenceNumber=record["SequenceNumber"],
+            data=base64.b64encode(record["Data"]).decode("ascii"),
+            approximateArrivalTimestamp=record["ApproximateArrivalTimestamp"].timestamp(),
+        ),
+        eventSource="aws:kinesis",
+        eventVersion="1.0",
+        eventID=f"{shard_id}:{record['SequenceNumber']}",
+        eventName="aws:kinesis:record",
+        invokeIdentityArn=f"arn:aws:iam::{account}:role/{func.name}",
+        awsRegion=region,
+        eventSourceARN=stream_arn,
+    )
@@ -1,7 +1,18 @@
+import dataclasses
 from dataclasses import dataclass
 from typing import Optional, Dict, List, TypedDict
 
 
+def _slotted(cls):
+    # The same as dataclass(slots=True), which needs Python 3.10. Slotted events are smaller and faster to fill.
+    slots = tuple(f.name for f in dataclasses.fields(cls))
+    namespace = {k: v for k, v in cls.__dict__.items() if k not in ("__dict__", "__weakref__") and k not in slots}
+    namespace["__slots__"] = slots
+    namespace["__qualname__"] = cls.__qualname__
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted
 @dataclass
 class Identity:
     caller: str
@@ -17,6 +28,7 @@ class Identity:
     cognitoIdentityId: str
 
 
+@_slotted
 @dataclass
 class RequestContext:
     stage: str
@@ -29,6 +41,7 @@ class RequestContext:
     accountId: str
 
 
+@_slotted
 @dataclass
 class ApiGatewayProxyEvent:
     body: Optional[Dict]
@@ -56,3 +69,43 @@ class Record(TypedDict):
 
 class SqsEvent(TypedDict):
     Records: List[Record]
+
+
+class KinesisData(TypedDict):
+    kinesisSchemaVersion: str
+    partitionKey: str
+    sequenceNumber: str
+    # Base64 encoded, as Lambda delivers it.
+    data: str
+    approximateArrivalTimestamp: float
+
+
+class KinesisRecord(TypedDict):
+    kinesis: KinesisData
+    eventSource: str
+    eventVersion: str
+    eventID: str
+    eventName: str
+    invokeIdentityArn: str
+    awsRegion: str
+    eventSourceARN: str
+
+
+class KinesisEvent(TypedDict):
+    Records: List[KinesisRecord]
+
+
+ScheduledEvent = TypedDict(
+    "ScheduledEvent",
+    {
+        "version": str,
+        "id": str,
+        "detail-type": str,
+        "source": str,
+        "account": str,
+        "time": str,
+        "region": str,
+        "resources": List[str],
+        "detail": Dict,
+    },
+)
@@ -1,43 +1,102 @@
 import asyncio
+import importlib
 import logging
 
-from typing import Union
+from typing import Union, Optional, List, Dict, Any, Iterable, TYPE_CHECKING
 
-import boto3
-from moto import mock_sqs, mock_dynamodb2
+from py_lambda_simulator.clock import Clock, RealClock
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.lifecycle import LifecycleTimings
 
-from py_lambda_simulator.http_lambda_simulator import (
-    HttpLambdaSimulator,
-    LambdaHttpFunc,
-    LambdaPureHttpFunc,
-)
-from py_lambda_simulator.sqs_lambda_simulator import SqsLambdaSimulator, LambdaSqsFunc
+if TYPE_CHECKING:
+    from py_lambda_simulator.aws_snapshot import AwsSnapshot
+    from py_lambda_simulator.seeding import ProgressCallback, SeedResult
+    from py_lambda_simulator.http_lambda_simulator import HttpLambdaSimulator, LambdaHttpFunc, LambdaPureHttpFunc
+    from py_lambda_simulator.kinesis_lambda_simulator import KinesisLambdaSimulator, LambdaKinesisFunc
+    from py_lambda_simulator.scheduled_lambda_simulator import ScheduledLambdaSimulator, LambdaScheduledFunc
+    from py_lambda_simulator.sqs_lambda_simulator import SqsLambdaSimulator, LambdaSqsFunc
+    from py_lambda_simulator.sqs_transport import SqsTransport
+    from py_lambda_simulator.tracing import SpanCollector
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Event sources and their dependencies (aiohttp, boto3, moto) are only imported once they are used.
+_LAZY_EXPORTS = {
+    "HttpLambdaSimulator": "py_lambda_simulator.http_lambda_simulator",
+    "LambdaHttpFunc": "py_lambda_simulator.http_lambda_simulator",
+    "LambdaPureHttpFunc": "py_lambda_simulator.http_lambda_simulator",
+    "KinesisLambdaSimulator": "py_lambda_simulator.kinesis_lambda_simulator",
+    "LambdaKinesisFunc": "py_lambda_simulator.kinesis_lambda_simulator",
+    "ScheduledLambdaSimulator": "py_lambda_simulator.scheduled_lambda_simulator",
+    "LambdaScheduledFunc": "py_lambda_simulator.scheduled_lambda_simulator",
+    "SqsLambdaSimulator": "py_lambda_simulator.sqs_lambda_simulator",
+    "LambdaSqsFunc": "py_lambda_simulator.sqs_lambda_simulator",
+}
+
+_SERVICE_MOCKS = {
+    "sqs": "mock_sqs",
+    "dynamodb": "mock_dynamodb2",
+    "kinesis": "mock_kinesis",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
 
 class AwsSimulator:
-    def __init__(self):
-        self.__sqs_mock = mock_sqs()
-        self.__dynamodb_mock = mock_dynamodb2()
-        self.__sqs_mock.start()
-        self.__dynamodb_mock.start()
+    def __init__(self, services: Iterable[str] = ("sqs", "dynamodb"), endpoint_url: Optional[str] = None):
+        # The mocks in services are started right away, so handlers that create their own boto3 clients never reach
+        # real AWS. Any other mock is started the first time its service is used, pass services=() to start every mock
+        # lazily. With an endpoint_url, e.g. a moto server, no mocks are started and the clients talk to that endpoint.
+        self.endpoint_url = endpoint_url
+        self.__mocks: Dict[str, Any] = {}
         self.__sqs_client = None
         self.__dynamodb_client = None
+        self.__kinesis_client = None
+        for service in services:
+            self.start_service(service)
+
+    def start_service(self, service: str):
+        if service not in _SERVICE_MOCKS:
+            raise Exception(f"Unsupported service {service}.")
+        if service not in self.__mocks and self.endpoint_url is None:
+            import moto
+
+            mock = getattr(moto, _SERVICE_MOCKS[service])()
+            mock.start()
+            self.__mocks[service] = mock
 
     def get_sqs_client(self):
         if not self.__sqs_client:
-            self.__sqs_client = boto3.client("sqs")
+            import boto3
+
+            self.start_service("sqs")
+            self.__sqs_client = boto3.client("sqs", endpoint_url=self.endpoint_url)
 
         return self.__sqs_client
 
     def get_dynamodb_client(self):
         if not self.__dynamodb_client:
-            self.__dynamodb_client = boto3.client("dynamodb")
+            import boto3
+
+            self.start_service("dynamodb")
+            self.__dynamodb_client = boto3.client("dynamodb", endpoint_url=self.endpoint_url)
 
         return self.__dynamodb_client
 
+    def get_kinesis_client(self):
+        if not self.__kinesis_client:
+            import boto3
+
+            self.start_service("kinesis")
+            self.__kinesis_client = boto3.client("kinesis", endpoint_url=self.endpoint_url)
+
+        return self.__kinesis_client
+
     def create_dynamodb_table(self, table_name, key_schema, attribute_definition):
         self.get_dynamodb_client().create_table(
             TableName=table_name,
@@ -54,29 +113,206 @@ class AwsSimulator:
 
         return {"queue_name": queue_name, "queue_url": queue_url}
 
+    def create_kinesis_stream(self, stream_name: str, shard_count: int = 1):
+        client = self.get_kinesis_client()
+        client.create_stream(StreamName=stream_name, ShardCount=shard_count)
+        stream_arn = client.describe_stream(StreamName=stream_name)["StreamDescription"]["StreamARN"]
+
+        return {"stream_name": stream_name, "stream_arn": stream_arn}
+
+    def seed_sqs_queue(
+        self,
+        queue_name: str,
+        messages: Iterable[Any],
+        workers: int = 8,
+        direct: bool = False,
+        progress: Optional["ProgressCallback"] = None,
+    ) -> "SeedResult":
+        # Messages are bodies, anything but a string is sent as JSON. With direct they are put straight into the
+        # moto backend, skipping the HTTP round trips, which is the fastest way to fill a queue.
+        from py_lambda_simulator import seeding
+
+        if direct:
+            return seeding.seed_sqs_backend(self.__get_backend("sqs"), queue_name, messages, progress)
+        queue_url = self.get_sqs_client().get_queue_url(QueueName=queue_name)["QueueUrl"]
+        return seeding.seed_sqs_queue(self.get_sqs_client(), queue_url, messages, workers, progress)
+
+    def seed_dynamodb_table(
+        self,
+        table_name: str,
+        items: Iterable[Dict],
+        workers: int = 8,
+        direct: bool = False,
+        progress: Optional["ProgressCallback"] = None,
+    ) -> "SeedResult":
+        # Items are plain dicts, e.g. rows read with seeding.read_jsonl or seeding.read_csv.
+        from py_lambda_simulator import seeding
+
+        if direct:
+            return seeding.seed_dynamodb_backend(self.__get_backend("dynamodb"), table_name, items, progress)
+        return seeding.seed_dynamodb_table(self.get_dynamodb_client(), table_name, items, workers, progress)
+
+    def __get_backend(self, service: str):
+        if self.endpoint_url is not None:
+            raise Exception(
+                f"Direct seeding needs the in-process mocks, not supported with endpoint {self.endpoint_url}."
+            )
+        client = self.get_sqs_client() if service == "sqs" else self.get_dynamodb_client()
+        return self.__mocks[service].backends[client.meta.region_name]
+
+    def snapshot(self) -> "AwsSnapshot":
+        # Captures queues, messages and tables of the started mocks, restore brings them back in place which is far
+        # cheaper than restarting the mocks and recreating everything.
+        from py_lambda_simulator.aws_snapshot import take_snapshot
+
+        self.__check_snapshots_supported()
+        return take_snapshot(self.__mocks)
+
+    def restore(self, snapshot: "AwsSnapshot"):
+        # Services started after the snapshot was taken are reset to empty.
+        from py_lambda_simulator.aws_snapshot import restore_snapshot
+
+        self.__check_snapshots_supported()
+        restore_snapshot(self.__mocks, snapshot)
+
+    def __check_snapshots_supported(self):
+        if self.endpoint_url is not None:
+            raise Exception(f"Snapshots need the in-process mocks, not supported with endpoint {self.endpoint_url}.")
+
     def shutdown(self):
-        self.__sqs_mock.stop()
-        self.__dynamodb_mock.stop()
+        for mock in self.__mocks.values():
+            mock.stop()
+        self.__mocks = {}
+        self.__sqs_client = None
+        self.__dynamodb_client = None
+        self.__kinesis_client = None
 
 
 class Simulator:
-    def __init__(self):
-        self.sqs = SqsLambdaSimulator()
-        self.http = HttpLambdaSimulator()
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        host: str = "localhost",
+        port: int = 8080,
+        sqs_transport: Optional["SqsTransport"] = None,
+        span_collector: Optional["SpanCollector"] = None,
+    ):
+        self.clock = clock or RealClock()
+        self.governor = governor or ConcurrencyGovernor()
+        self.lifecycle = LifecycleTimings()
+        self.host = host
+        self.port = port
+        self.sqs_transport = sqs_transport
+        self.span_collector = span_collector
+        self.__tasks: List[asyncio.Task] = []
+        self.__sqs: Optional["SqsLambdaSimulator"] = None
+        self.__http: Optional["HttpLambdaSimulator"] = None
+        self.__scheduled: Optional["ScheduledLambdaSimulator"] = None
+        self.__kinesis: Optional["KinesisLambdaSimulator"] = None
+
+    @property
+    def sqs(self) -> "SqsLambdaSimulator":
+        if self.__sqs is None:
+            from py_lambda_simulator.sqs_lambda_simulator import SqsLambdaSimulator
+
+            self.__sqs = SqsLambdaSimulator(
+                clock=self.clock,
+                governor=self.governor,
+                transport=self.sqs_transport,
+                span_collector=self.span_collector,
+            )
+        return self.__sqs
+
+    @property
+    def http(self) -> "HttpLambdaSimulator":
+        if self.__http is None:
+            from py_lambda_simulator.http_lambda_simulator import HttpLambdaSimulator
+
+            self.__http = HttpLambdaSimulator(
+                clock=self.clock,
+                governor=self.governor,
+                host=self.host,
+                port=self.port,
+                span_collector=self.span_collector,
+            )
+        return self.__http
+
+    @property
+    def scheduled(self) -> "ScheduledLambdaSimulator":
+        if self.__scheduled is None:
+            from py_lambda_simulator.scheduled_lambda_simulator import ScheduledLambdaSimulator
+
+            self.__scheduled = ScheduledLambdaSimulator(clock=self.clock, governor=self.governor)
+        return self.__scheduled
+
+    @property
+    def kinesis(self) -> "KinesisLambdaSimulator":
+        if self.__kinesis is None:
+            from py_lambda_simulator.kinesis_lambda_simulator import KinesisLambdaSimulator
+
+            self.__kinesis = KinesisLambdaSimulator(
+                clock=self.clock, governor=self.governor, span_collector=self.span_collector
+            )
+        return self.__kinesis
+
+    def __pollers(self) -> list:
+        return [s for s in (self.__sqs, self.__scheduled, self.__kinesis) if s is not None]
+
+    def __created_simulators(self) -> list:
+        return [s for s in (self.__sqs, self.__http, self.__scheduled, self.__kinesis) if s is not None]
+
+    def add_func(
+        self,
+        func: Union[
+            "LambdaSqsFunc", "LambdaPureHttpFunc", "LambdaHttpFunc", "LambdaScheduledFunc", "LambdaKinesisFunc"
+        ],
+    ):
+        # Checked cheapest module first, so adding an SQS, scheduled or Kinesis func never imports aiohttp.
+        from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc
+        from py_lambda_simulator.scheduled_lambda_simulator import LambdaScheduledFunc
+        from py_lambda_simulator.kinesis_lambda_simulator import LambdaKinesisFunc
 
-    def add_func(self, func: Union[LambdaSqsFunc, LambdaPureHttpFunc, LambdaHttpFunc]):
         if type(func) == LambdaSqsFunc:
             self.sqs.add_func(func)
-        elif type(func) == LambdaHttpFunc or type(func) == LambdaPureHttpFunc:
-            self.http.add_func(func)
+        elif type(func) == LambdaScheduledFunc:
+            self.scheduled.add_func(func)
+        elif type(func) == LambdaKinesisFunc:
+            self.kinesis.add_func(func)
+        else:
+            from py_lambda_simulator.http_lambda_simulator import LambdaHttpFunc, LambdaPureHttpFunc
+
+            if type(func) == LambdaHttpFunc or type(func) == LambdaPureHttpFunc:
+                self.http.add_func(func)
 
     def remove_func(self, name: str):
-        self.sqs.remove_func(name)
-        self.http.remove_func(name)
+        for simulator in self.__created_simulators():
+            if name in simulator.funcs:
+                simulator.remove_func(name)
 
     async def start(self):
-        return asyncio.gather(self.sqs.start(), self.http.start())
+        # Returns once every event source is ready, the pollers keep running in the background until stop.
+        self.lifecycle = LifecycleTimings(start_requested_at=LifecycleTimings.now())
+        # HTTP binds first, so a port already in use fails start before any poller is running.
+        if self.__http is not None:
+            await self.__http.start()
+        pollers = self.__pollers()
+        self.__tasks = [asyncio.ensure_future(poller.start()) for poller in pollers]
+        if pollers:
+            ready = asyncio.ensure_future(asyncio.gather(*(poller.wait_until_ready() for poller in pollers)))
+            await asyncio.wait({ready, *self.__tasks}, return_when=asyncio.FIRST_COMPLETED)
+            if not ready.done():
+                ready.cancel()
+                for task in self.__tasks:
+                    if task.done():
+                        task.result()
+        self.lifecycle.ready_at = LifecycleTimings.now()
 
-    async def stop(self):
-        self.sqs.stop()
-        await self.http.stop()
+    async def stop(self, drain_timeout: Optional[float] = None):
+        self.lifecycle.stop_requested_at = LifecycleTimings.now()
+        for poller in self.__pollers():
+            poller.stop(drain_timeout)
+        if self.__http is not None:
+            await self.__http.stop(drain_timeout)
+        await asyncio.gather(*self.__tasks)
+        self.lifecycle.stopped_at = LifecycleTimings.now()
@@ -0,0 +1,31 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class LifecycleTimings:
+    # Monotonic wall-clock timestamps, also under a virtual clock, so fixtures can see real startup and drain cost.
+    start_requested_at: Optional[float] = None
+    ready_at: Optional[float] = None
+    stop_requested_at: Optional[float] = None
+    stopped_at: Optional[float] = None
+    drained_invocations: int = 0
+    abandoned_invocations: int = 0
+    released_messages: int = 0
+
+    @staticmethod
+    def now() -> float:
+        return time.monotonic()
+
+    @property
+    def startup_seconds(self) -> Optional[float]:
+        if self.start_requested_at is None or self.ready_at is None:
+            return None
+        return self.ready_at - self.start_requested_at
+
+    @property
+    def drain_seconds(self) -> Optional[float]:
+        if self.stop_requested_at is None or self.stopped_at is None:
+            return None
+        return self.stopped_at - self.stop_requested_at
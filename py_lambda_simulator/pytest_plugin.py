@@ -0,0 +1,60 @@
+import asyncio
+import os
+
+import pytest
+
+# The plugin is loaded by every pytest run in a project that installs the package, so the simulator modules, which
+# configure logging when imported, are only imported once a fixture is used.
+try:
+    from pytest_asyncio import fixture as async_fixture
+except ImportError:
+    async_fixture = pytest.fixture
+
+
+@pytest.fixture(scope="session")
+def aws_simulator_session():
+    from py_lambda_simulator.lambda_simulator import AwsSimulator
+
+    # One set of moto mocks for the whole session, aws_simulator resets its state after every test.
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    simulator = AwsSimulator()
+    yield simulator
+    simulator.shutdown()
+
+
+@pytest.fixture
+def aws_simulator(aws_simulator_session):
+    # Queues and tables created by a test are dropped after it, whatever existed before the test is kept.
+    snapshot = aws_simulator_session.snapshot()
+    yield aws_simulator_session
+    aws_simulator_session.restore(snapshot)
+
+
+@async_fixture
+async def sqs_simulator(aws_simulator):
+    from py_lambda_simulator.sqs_lambda_simulator import SqsLambdaSimulator
+
+    simulator = SqsLambdaSimulator()
+    # Runs start in a task the fixture keeps, so a simulator a test left running in the background is awaited
+    # after stopping it and a poller that failed is reported instead of leaking into later tests.
+    tasks = []
+    start = simulator.start
+
+    def start_in_task():
+        task = asyncio.ensure_future(start())
+        tasks.append(task)
+        return task
+
+    simulator.start = start_in_task
+    yield simulator
+    simulator.stop()
+    await asyncio.gather(*tasks)
+
+
+@async_fixture
+async def http_simulator():
+    from py_lambda_simulator.http_lambda_simulator import HttpLambdaSimulator
+
+    simulator = HttpLambdaSimulator(port=0)
+    yield simulator
+    await simulator.stop()
@@ -0,0 +1,245 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from py_lambda_simulator.clock import Clock, RealClock
+from py_lambda_simulator.event_decoders import decode
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, KinesisEvent, SqsEvent
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _to_jsonable(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _to_jsonable(getattr(value, f.name)) for f in dataclasses.fields(value)}
+    if isinstance(value, dict) or hasattr(value, "items"):
+        return {str(k): _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class InvocationRecorder:
+    """
+    Appends one JSON line per invocation: source, function, start time, event, response, duration and error.
+
+    Lines are buffered and written by a background thread every buffer_size invocations, so recording does not block
+    the event loop in the middle of the invocations it measures. Whatever is still buffered is written by close.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 100):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.__file = open(path, "a", encoding="utf-8")
+        self.__buffer: List[str] = []
+        # A single writer keeps the lines in the order they were recorded.
+        self.__writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="invocation-recorder")
+
+    def record(
+        self,
+        source: str,
+        function: str,
+        started_at: float,
+        event: Any,
+        response: Any,
+        duration: float,
+        error: Optional[BaseException] = None,
+    ):
+        line = {
+            "source": source,
+            "function": function,
+            "started_at": started_at,
+            "duration": duration,
+            "event": _to_jsonable(event),
+            "response": _to_jsonable(response),
+            "error": repr(error) if error is not None else None,
+        }
+        self.__buffer.append(json.dumps(line, separators=(",", ":")) + "\n")
+        if len(self.__buffer) >= self.buffer_size:
+            self.__flush()
+
+    def __flush(self):
+        lines, self.__buffer = self.__buffer, []
+        if lines:
+            self.__writer.submit(self.__write, lines)
+
+    def __write(self, lines: List[str]):
+        self.__file.writelines(lines)
+        self.__file.flush()
+
+    def close(self):
+        self.__flush()
+        self.__writer.shutdown(wait=True)
+        self.__file.close()
+
+
+def read_recording(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Event classes per source, recorded events of other sources are replayed as the plain JSON they were recorded as.
+_EVENT_TYPES = {"http": ApiGatewayProxyEvent, "sqs": SqsEvent, "kinesis": KinesisEvent}
+
+
+@dataclass
+class LatencyStats:
+    count: int = 0
+    mean: float = 0.0
+    p50: float = 0.0
+    p99: float = 0.0
+    max: float = 0.0
+
+    @classmethod
+    def of(cls, durations: List[float]) -> "LatencyStats":
+        if not durations:
+            return cls()
+        ordered = sorted(durations)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, math.ceil(p * len(ordered)) - 1)]
+
+        return cls(
+            count=len(ordered),
+            mean=sum(ordered) / len(ordered),
+            p50=percentile(0.5),
+            p99=percentile(0.99),
+            max=ordered[-1],
+        )
+
+
+@dataclass
+class FunctionReplayReport:
+    function: str
+    recorded: LatencyStats
+    replayed: LatencyStats
+    response_mismatches: int = 0
+    new_errors: int = 0
+    fixed_errors: int = 0
+
+
+@dataclass
+class ReplayReport:
+    functions: Dict[str, FunctionReplayReport] = field(default_factory=dict)
+    missing_functions: Set[str] = field(default_factory=set)
+    elapsed: float = 0.0
+
+    def regressions(self, latency_threshold: float = 1.2) -> List[str]:
+        return [
+            name
+            for name, report in self.functions.items()
+            if report.response_mismatches
+            or report.new_errors
+            or report.replayed.p99 > report.recorded.p99 * latency_threshold
+        ]
+
+    def format(self) -> str:
+        lines = [
+            f"{'function':<30} {'count':>7} {'rec p50':>9} {'new p50':>9} {'rec p99':>9} {'new p99':>9} "
+            f"{'mismatch':>8} {'new err':>7}"
+        ]
+        for name, report in sorted(self.functions.items()):
+            lines.append(
+                f"{name:<30} {report.replayed.count:>7} "
+                f"{report.recorded.p50 * 1000:>7.2f}ms {report.replayed.p50 * 1000:>7.2f}ms "
+                f"{report.recorded.p99 * 1000:>7.2f}ms {report.replayed.p99 * 1000:>7.2f}ms "
+                f"{report.response_mismatches:>8} {report.new_errors:>7}"
+            )
+        for name in sorted(self.missing_functions):
+            lines.append(f"{name:<30} not replayed, function missing")
+        return "\n".join(lines)
+
+
+class InvocationReplayer:
+    """
+    Streams a recording back into handlers and compares latency, responses and errors with the recording.
+
+    speed scales the recorded gaps between invocations, None replays as fast as concurrency allows.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, concurrency: int = 10, clock: Optional[Clock] = None):
+        self.path = path
+        self.speed = speed
+        self.concurrency = concurrency
+        self.clock = clock or RealClock()
+
+    async def replay(self, funcs: Dict[str, Any]) -> ReplayReport:
+        report = ReplayReport()
+        recorded: Dict[str, List[float]] = {}
+        replayed: Dict[str, List[float]] = {}
+        slots = asyncio.Semaphore(self.concurrency)
+        running: Set[asyncio.Task] = set()
+        first_started_at = None
+        replay_started_at = self.clock.time()
+        wall_started_at = time.perf_counter()
+
+        for line in read_recording(self.path):
+            func = funcs.get(line["function"])
+            if func is None:
+                report.missing_functions.add(line["function"])
+                continue
+            if first_started_at is None:
+                first_started_at = line["started_at"]
+            if self.speed is not None:
+                offset = (line["started_at"] - first_started_at) / self.speed
+                await self.clock.sleep(offset - (self.clock.time() - replay_started_at))
+
+            await slots.acquire()
+            task = asyncio.ensure_future(self.__invoke(func, line, report, recorded, replayed))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        if running:
+            await asyncio.gather(*running)
+
+        for name in replayed:
+            report.functions[name].recorded = LatencyStats.of(recorded[name])
+            report.functions[name].replayed = LatencyStats.of(replayed[name])
+        report.elapsed = time.perf_counter() - wall_started_at
+        return report
+
+    async def __invoke(
+        self,
+        func: Any,
+        line: Dict,
+        report: ReplayReport,
+        recorded: Dict[str, List[float]],
+        replayed: Dict[str, List[float]],
+    ):
+        name = line["function"]
+        event_type = _EVENT_TYPES.get(line["source"])
+        event = decode(event_type, line["event"]) if event_type and line["event"] else line["event"]
+
+        error = None
+        response = None
+        started = time.perf_counter()
+        try:
+            response = await self.clock.run_in_thread(func.handler_func, event, {})
+        except Exception as e:
+            error = e
+        duration = time.perf_counter() - started
+
+        function_report = report.functions.setdefault(
+            name, FunctionReplayReport(function=name, recorded=LatencyStats(), replayed=LatencyStats())
+        )
+        recorded.setdefault(name, []).append(line["duration"])
+        replayed.setdefault(name, []).append(duration)
+        if error is not None and line["error"] is None:
+            function_report.new_errors += 1
+            logger.info(f"Replay of {name} failed where the recording succeeded: {error!r}")
+        elif error is None and line["error"] is not None:
+            function_report.fixed_errors += 1
+        elif error is None and _to_jsonable(response) != line["response"]:
+            function_report.response_mismatches += 1
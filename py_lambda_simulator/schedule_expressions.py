@@ -0,0 +1,162 @@
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, FrozenSet
+
+_RATE_UNITS = {
+    "minute": 60,
+    "minutes": 60,
+    "hour": 3600,
+    "hours": 3600,
+    "day": 86400,
+    "days": 86400,
+}
+
+_MONTH_NAMES = {name.upper(): i for i, name in enumerate(calendar.month_abbr) if name}
+# AWS cron day-of-week counts from 1 (SUN) to 7 (SAT).
+_DAY_NAMES = {"SUN": 1, "MON": 2, "TUE": 3, "WED": 4, "THU": 5, "FRI": 6, "SAT": 7}
+
+_MIN_YEAR = 1970
+_MAX_YEAR = 2199
+
+
+class Schedule:
+    expression: str
+
+    def next_fire_time(self, after: float) -> Optional[float]:
+        raise NotImplementedError
+
+
+@dataclass
+class RateSchedule(Schedule):
+    expression: str
+    period: int
+
+    def next_fire_time(self, after: float) -> Optional[float]:
+        return after + self.period
+
+
+@dataclass
+class CronSchedule(Schedule):
+    expression: str
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days_of_month: Optional[FrozenSet[int]]
+    months: FrozenSet[int]
+    days_of_week: Optional[FrozenSet[int]]
+    years: FrozenSet[int]
+    last_day_of_month: bool = False
+
+    def next_fire_time(self, after: float) -> Optional[float]:
+        t = datetime.fromtimestamp(after, tz=timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        while t.year <= _MAX_YEAR:
+            if t.year not in self.years:
+                next_year = min((y for y in self.years if y > t.year), default=None)
+                if next_year is None:
+                    return None
+                t = t.replace(year=next_year, month=1, day=1, hour=0, minute=0)
+                continue
+            if t.month not in self.months:
+                t = _first_of_next_month(t)
+                continue
+            if not self.__day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+                continue
+            next_minute = next((m for m in sorted(self.minutes) if m >= t.minute), None)
+            if next_minute is None:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+                continue
+            return t.replace(minute=next_minute).timestamp()
+        return None
+
+    def __day_matches(self, t: datetime) -> bool:
+        if self.days_of_week is not None:
+            return (t.isoweekday() % 7) + 1 in self.days_of_week
+        if self.last_day_of_month:
+            return t.day == calendar.monthrange(t.year, t.month)[1]
+        return t.day in self.days_of_month
+
+
+def _first_of_next_month(t: datetime) -> datetime:
+    if t.month == 12:
+        return t.replace(year=t.year + 1, month=1, day=1, hour=0, minute=0)
+    return t.replace(month=t.month + 1, day=1, hour=0, minute=0)
+
+
+def _parse_value(value: str, names: Dict[str, int]) -> int:
+    upper = value.upper()
+    if upper in names:
+        return names[upper]
+    if not value.isdigit():
+        raise Exception(f"Invalid value {value} in cron expression.")
+    return int(value)
+
+
+def _parse_field(field: str, low: int, high: int, names: Dict[str, int] = None) -> FrozenSet[int]:
+    names = names or {}
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            if not step_str.isdigit() or int(step_str) == 0:
+                raise Exception(f"Invalid step {step_str} in cron expression.")
+            step = int(step_str)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = _parse_value(start_str, names), _parse_value(end_str, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise Exception(f"Value {part} out of range {low}-{high} in cron expression.")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+def _parse_cron(expression: str, body: str) -> CronSchedule:
+    fields = body.split()
+    if len(fields) != 6:
+        raise Exception(f"Cron expression {expression} must have 6 fields.")
+    minutes, hours, days_of_month, months, days_of_week, years = fields
+    if (days_of_month == "?") == (days_of_week == "?"):
+        raise Exception(f"Cron expression {expression} must use ? in exactly one of day-of-month and day-of-week.")
+    if (days_of_month != "L" and re.search(r"[LW]", days_of_month)) or re.search(r"#|L$", days_of_week):
+        raise Exception(f"Cron expression {expression} uses an unsupported wildcard.")
+
+    return CronSchedule(
+        expression=expression,
+        minutes=_parse_field(minutes, 0, 59),
+        hours=_parse_field(hours, 0, 23),
+        days_of_month=None if days_of_month in ("?", "L") else _parse_field(days_of_month, 1, 31),
+        months=_parse_field(months, 1, 12, _MONTH_NAMES),
+        days_of_week=None if days_of_week == "?" else _parse_field(days_of_week, 1, 7, _DAY_NAMES),
+        years=_parse_field(years, _MIN_YEAR, _MAX_YEAR),
+        last_day_of_month=days_of_month == "L",
+    )
+
+
+def _parse_rate(expression: str, body: str) -> RateSchedule:
+    parts: List[str] = body.split()
+    if len(parts) != 2 or not parts[0].isdigit() or parts[1] not in _RATE_UNITS:
+        raise Exception(f"Invalid rate expression {expression}.")
+    value, unit = int(parts[0]), parts[1]
+    if value <= 0 or (value == 1) != (not unit.endswith("s")):
+        raise Exception(f"Invalid rate expression {expression}.")
+    return RateSchedule(expression=expression, period=value * _RATE_UNITS[unit])
+
+
+def parse_schedule_expression(expression: str) -> Schedule:
+    match = re.fullmatch(r"\s*(rate|cron)\((.*)\)\s*", expression)
+    if not match:
+        raise Exception(f"Invalid schedule expression {expression}, expected rate(...) or cron(...).")
+    kind, body = match.groups()
+    if kind == "rate":
+        return _parse_rate(expression, body)
+    return _parse_cron(expression, body)
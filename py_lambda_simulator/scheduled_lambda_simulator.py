@@ -0,0 +1,233 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Any, Deque, Dict, List, Literal, Optional, Set, Tuple
+
+from py_lambda_simulator.clock import Clock, RealClock
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.lambda_config import LambdaConfig
+from py_lambda_simulator.lambda_events import ScheduledEvent
+from py_lambda_simulator.lifecycle import LifecycleTimings
+from py_lambda_simulator.schedule_expressions import Schedule, parse_schedule_expression
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LambdaScheduledFunc(LambdaConfig):
+    schedule_expression: str
+    handler_func: Callable[[ScheduledEvent, Any], None]
+    # What to do with fire times that were missed by more than misfire_grace_time seconds:
+    # fire_once coalesces them into a single invocation, fire_all catches up on every one and skip drops them.
+    missed_fire_policy: Literal["fire_once", "fire_all", "skip"] = "fire_once"
+    misfire_grace_time: float = 1.0
+    allow_overlap: bool = False
+    # Throttled invocations are retried with backoff until the event is this old, like any async invocation.
+    maximum_event_age_in_seconds: int = 21600
+
+
+@dataclass
+class ScheduleState:
+    schedule: Schedule
+    next_fire_time: Optional[float]
+    generation: int
+    running: int = 0
+    fired_count: int = 0
+    missed_count: int = 0
+    overlap_skipped_count: int = 0
+    error_count: int = 0
+    dropped_count: int = 0
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+    # Missed fire times caught up on with fire_all that wait for the invocation before them to finish.
+    catch_up: Deque[float] = field(default_factory=deque)
+
+
+class ScheduledLambdaSimulator:
+    def __init__(self, clock: Optional[Clock] = None, governor: Optional[ConcurrencyGovernor] = None):
+        self.funcs: Dict[str, LambdaScheduledFunc] = {}
+        self.clock = clock or RealClock()
+        self.governor = governor or ConcurrencyGovernor()
+        self.states: Dict[str, ScheduleState] = {}
+        self.is_started = False
+        self.__timers: List[Tuple[float, int, str, int]] = []
+        self.__sequence = itertools.count()
+        self.__generations = itertools.count()
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__wakeup: Optional[asyncio.Event] = None
+        self.__stopping: Optional[asyncio.Event] = None
+        self.__ready: Optional[asyncio.Event] = None
+        self.__drain_timeout: Optional[float] = None
+        self.lifecycle = LifecycleTimings()
+
+    def add_func(self, func: LambdaScheduledFunc):
+        if func.name in self.funcs:
+            raise Exception(f"Function with name {func.name} already added.")
+        schedule = parse_schedule_expression(func.schedule_expression)
+        self.funcs[func.name] = func
+        self.states[func.name] = ScheduleState(
+            schedule=schedule, next_fire_time=None, generation=next(self.__generations)
+        )
+        if self.is_started:
+            self.__schedule(func.name, schedule.next_fire_time(self.clock.time()))
+            self.__wake()
+
+    def remove_func(self, name: str):
+        self.funcs.pop(name)
+        # Timers of removed functions stay in the heap and are discarded when they come due.
+        self.states.pop(name)
+
+    def get_next_fire_time(self, name: str) -> Optional[float]:
+        return self.states[name].next_fire_time
+
+    def __schedule(self, name: str, fire_time: Optional[float]):
+        state = self.states[name]
+        state.next_fire_time = fire_time
+        if fire_time is None:
+            logger.info(f"Schedule for {name} has no more fire times")
+            return
+        heapq.heappush(self.__timers, (fire_time, next(self.__sequence), name, state.generation))
+
+    def __wake(self):
+        if self.__loop is not None and not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(self.__wakeup.set)
+
+    async def wait_until_ready(self):
+        await self.__get_ready().wait()
+
+    def __get_ready(self) -> asyncio.Event:
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
+        return self.__ready
+
+    async def start(self):
+        self.lifecycle = LifecycleTimings(start_requested_at=LifecycleTimings.now())
+        self.__loop = asyncio.get_running_loop()
+        self.__wakeup = asyncio.Event()
+        self.__stopping = asyncio.Event()
+        self.__drain_timeout = None
+        self.__timers = []
+        for state in self.states.values():
+            state.catch_up.clear()
+        self.is_started = True
+        now = self.clock.time()
+        for name, state in self.states.items():
+            self.__schedule(name, state.schedule.next_fire_time(now))
+        self.lifecycle.ready_at = LifecycleTimings.now()
+        self.__get_ready().set()
+
+        while self.is_started:
+            self.__wakeup.clear()
+            timeout = self.__timers[0][0] - self.clock.time() if self.__timers else None
+            if timeout is None or timeout > 0:
+                await self.clock.wait(self.__wakeup, timeout)
+                continue
+            self.__fire_due(self.clock.time())
+
+        running = [task for state in self.states.values() for task in state.tasks]
+        if running:
+            done, pending = await asyncio.wait(running, timeout=self.__drain_timeout)
+            self.lifecycle.drained_invocations = len(done)
+            self.lifecycle.abandoned_invocations = len(pending)
+            for task in pending:
+                task.cancel()
+        self.__get_ready().clear()
+        self.lifecycle.stopped_at = LifecycleTimings.now()
+
+    def __fire_due(self, now: float):
+        while self.__timers and self.__timers[0][0] <= now:
+            fire_time, _, name, generation = heapq.heappop(self.__timers)
+            state = self.states.get(name)
+            if state is None or state.generation != generation:
+                continue
+            func = self.funcs[name]
+            missed = now - fire_time > func.misfire_grace_time
+            if missed:
+                state.missed_count += 1
+                logger.info(f"Missed fire time {fire_time} for {name}, applying {func.missed_fire_policy}")
+
+            if missed and func.missed_fire_policy == "fire_all" and not func.allow_overlap:
+                # Catching up runs the missed invocations one after another instead of skipping them as overlaps.
+                state.catch_up.append(fire_time)
+                if not state.running:
+                    self.__invoke(func, state, state.catch_up.popleft())
+            elif not missed or func.missed_fire_policy != "skip":
+                self.__invoke(func, state, fire_time)
+
+            if missed and func.missed_fire_policy != "fire_all":
+                next_fire_time = state.schedule.next_fire_time(fire_time)
+                while next_fire_time is not None and next_fire_time <= now:
+                    next_fire_time = state.schedule.next_fire_time(next_fire_time)
+            else:
+                next_fire_time = state.schedule.next_fire_time(fire_time)
+            self.__schedule(name, next_fire_time)
+
+    def __invoke(self, func: LambdaScheduledFunc, state: ScheduleState, fire_time: float):
+        if state.running and not func.allow_overlap:
+            state.overlap_skipped_count += 1
+            logger.info(f"Skipping {func.name}, previous invocation is still running")
+            return
+
+        event = ScheduledEvent(
+            **{
+                "version": "0",
+                "id": str(uuid.uuid4()),
+                "detail-type": "Scheduled Event",
+                "source": "aws.events",
+                "account": "123456789012",
+                "time": datetime.fromtimestamp(fire_time, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "region": "us-east-1",
+                "resources": [f"arn:aws:events:us-east-1:123456789012:rule/{func.name}"],
+                "detail": {},
+            }
+        )
+
+        state.running += 1
+        state.fired_count += 1
+
+        async def run():
+            try:
+                if not await self.__acquire(func, fire_time):
+                    state.dropped_count += 1
+                    return
+                try:
+                    logger.info(f"Invoking {func.name}")
+                    await self.clock.run_in_thread(func.handler_func, event, {})
+                finally:
+                    self.governor.release(func.name)
+            except Exception:
+                state.error_count += 1
+                logger.exception(f"Scheduled invocation of {func.name} failed")
+            finally:
+                state.running -= 1
+                if state.catch_up and self.is_started and self.states.get(func.name) is state:
+                    self.__invoke(func, state, state.catch_up.popleft())
+
+        task = asyncio.ensure_future(run())
+        state.tasks.add(task)
+        task.add_done_callback(state.tasks.discard)
+
+    async def __acquire(self, func: LambdaScheduledFunc, fire_time: float) -> bool:
+        backoff = 1
+        while not self.governor.try_acquire(func.name):
+            if self.clock.time() + backoff - fire_time > func.maximum_event_age_in_seconds:
+                logger.info(f"Dropping event for {func.name}, it exceeded the maximum event age")
+                return False
+            if await self.clock.wait(self.__stopping, backoff):
+                return False
+            backoff = min(backoff * 2, 300)
+        return True
+
+    def stop(self, drain_timeout: Optional[float] = None):
+        self.is_started = False
+        self.__drain_timeout = drain_timeout
+        if self.lifecycle.stop_requested_at is None:
+            self.lifecycle.stop_requested_at = LifecycleTimings.now()
+        if self.__loop is not None and not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(self.__stopping.set)
+        self.__wake()
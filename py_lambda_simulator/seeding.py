@@ -0,0 +1,178 @@
+import csv
+import itertools
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# API limits per batch request.
+SQS_BATCH_SIZE = 10
+DYNAMODB_BATCH_SIZE = 25
+MAX_BATCH_RETRIES = 5
+
+
+@dataclass
+class SeedResult:
+    count: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+
+ProgressCallback = Callable[[SeedResult], None]
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_csv(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, encoding="utf-8", newline="") as file:
+        yield from csv.DictReader(file)
+
+
+def _chunks(values: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(values)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _message_body(message: Any) -> str:
+    return message if isinstance(message, str) else json.dumps(message)
+
+
+def _to_attribute_values(item: Dict) -> Dict:
+    from boto3.dynamodb.types import TypeSerializer
+
+    serializer = TypeSerializer()
+    # The serializer rejects floats, as DynamoDB numbers are exact.
+    return {
+        key: serializer.serialize(Decimal(str(value)) if isinstance(value, float) else value)
+        for key, value in item.items()
+    }
+
+
+def _finished(count: int, started: float) -> SeedResult:
+    result = SeedResult(count=count, elapsed=time.perf_counter() - started)
+    logger.info(f"Seeded {result.count} records in {result.elapsed:.2f}s, {result.rate:.0f}/s")
+    return result
+
+
+def _run_batches(
+    batches: Iterable[List[Any]], send: Callable[[List[Any]], None], workers: int, progress: Optional[ProgressCallback]
+) -> SeedResult:
+    # Batches are read lazily with at most two per worker in flight, so seeding from a large file never holds more
+    # than a few batches in memory.
+    started = time.perf_counter()
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight: Dict[Future, int] = {}
+
+        def collect(done: Set[Future]):
+            nonlocal count
+            for future in done:
+                future.result()
+                count += in_flight.pop(future)
+                if progress is not None:
+                    progress(SeedResult(count=count, elapsed=time.perf_counter() - started))
+
+        for batch in batches:
+            if len(in_flight) >= workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight[executor.submit(send, batch)] = len(batch)
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    return _finished(count, started)
+
+
+def _run_direct(values: Iterable[Any], put: Callable[[Any], None], progress: Optional[ProgressCallback]) -> SeedResult:
+    started = time.perf_counter()
+    count = 0
+    for batch in _chunks(values, 1000):
+        for value in batch:
+            put(value)
+        count += len(batch)
+        if progress is not None:
+            progress(SeedResult(count=count, elapsed=time.perf_counter() - started))
+
+    return _finished(count, started)
+
+
+def seed_sqs_queue(
+    client, queue_url: str, messages: Iterable[Any], workers: int = 8, progress: Optional[ProgressCallback] = None
+) -> SeedResult:
+    def send(batch: List[Any]):
+        entries = [{"Id": str(i), "MessageBody": _message_body(message)} for i, message in enumerate(batch)]
+        for _ in range(MAX_BATCH_RETRIES):
+            failed = client.send_message_batch(QueueUrl=queue_url, Entries=entries).get("Failed", [])
+            if not failed:
+                return
+            failed_ids = {f["Id"] for f in failed}
+            entries = [entry for entry in entries if entry["Id"] in failed_ids]
+        raise Exception(f"Failed to send {len(entries)} messages to {queue_url}: {failed[0].get('Message')}")
+
+    return _run_batches(_chunks(messages, SQS_BATCH_SIZE), send, workers, progress)
+
+
+def seed_sqs_backend(
+    backend, queue_name: str, messages: Iterable[Any], progress: Optional[ProgressCallback] = None
+) -> SeedResult:
+    # moto's send_message recomputes the queue attributes, scanning every message in the queue, for each message
+    # sent. Appending to the queue directly keeps seeding linear in the number of messages.
+    from moto.sqs.models import Message
+
+    queue = backend.get_queue(queue_name)
+    if queue.fifo_queue:
+        raise Exception(f"Direct seeding only supports standard queues, {queue_name} is a FIFO queue.")
+
+    def put(message: Any):
+        body = _message_body(message)
+        if len(body) > queue.maximum_message_size:
+            raise Exception(f"Message must be shorter than {queue.maximum_message_size} bytes.")
+        sqs_message = Message(str(uuid.uuid4()), body)
+        sqs_message.mark_sent(delay_seconds=queue.delay_seconds)
+        queue._messages.append(sqs_message)
+
+    return _run_direct(messages, put, progress)
+
+
+def seed_dynamodb_table(
+    client,
+    table_name: str,
+    items: Iterable[Dict],
+    workers: int = 8,
+    progress: Optional[ProgressCallback] = None,
+) -> SeedResult:
+    def send(batch: List[Dict]):
+        requests = {table_name: [{"PutRequest": {"Item": _to_attribute_values(item)}} for item in batch]}
+        for _ in range(MAX_BATCH_RETRIES):
+            requests = client.batch_write_item(RequestItems=requests).get("UnprocessedItems", {})
+            if not requests:
+                return
+        raise Exception(f"Failed to write {len(requests[table_name])} items to {table_name}.")
+
+    return _run_batches(_chunks(items, DYNAMODB_BATCH_SIZE), send, workers, progress)
+
+
+def seed_dynamodb_backend(
+    backend, table_name: str, items: Iterable[Dict], progress: Optional[ProgressCallback] = None
+) -> SeedResult:
+    return _run_direct(items, lambda item: backend.put_item(table_name, _to_attribute_values(item)), progress)
@@ -1,12 +1,19 @@
+import asyncio
 import logging
+import math
+from collections import defaultdict
 from dataclasses import dataclass, asdict
-from typing import Dict, Callable, Any
-
-import boto3
-from asyncer import asyncify
+from typing import Dict, Callable, Any, List, Optional, Set, Tuple
 
+from py_lambda_simulator.clock import Clock, RealClock
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.invocation import invoke_handler
 from py_lambda_simulator.lambda_config import LambdaConfig
 from py_lambda_simulator.lambda_events import Record, SqsEvent
+from py_lambda_simulator.lifecycle import LifecycleTimings
+from py_lambda_simulator.recording import InvocationRecorder
+from py_lambda_simulator.sqs_transport import BotoSqsTransport, SqsQueue, SqsTransport
+from py_lambda_simulator.tracing import SpanCollector, sqs_trace_parent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,56 +24,277 @@ class LambdaSqsFunc(LambdaConfig):
     queue_name: str
     handler_func: Callable[[SqsEvent, Any], None]
     max_number_of_messages: int = 1
+    maximum_batching_window_in_seconds: float = 0
+    maximum_concurrency: int = 1
 
 
 class SqsLambdaSimulator:
-    def __init__(self):
-        self.sqs_client = None
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        recorder: Optional[InvocationRecorder] = None,
+        transport: Optional[SqsTransport] = None,
+        span_collector: Optional[SpanCollector] = None,
+    ):
+        self.transport = transport or BotoSqsTransport()
+        self.span_collector = span_collector
         self.funcs: Dict[str, LambdaSqsFunc] = {}
         self.is_started = False
-
-    def __get_sqs_client(self):
-        if not self.sqs_client:
-            self.sqs_client = boto3.client("sqs")
-        return self.sqs_client
+        self.clock = clock or RealClock()
+        self.governor = governor or ConcurrencyGovernor()
+        self.recorder = recorder
+        self.wait_time_seconds = 1
+        self.throttle_backoff_seconds = 1
+        self.__invocations: Dict[str, Set[asyncio.Task]] = defaultdict(set)
+        self.__throttle_backoff: Dict[str, float] = {}
+        self.__throttled_until: Dict[str, float] = {}
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__invocation_messages: Dict[asyncio.Task, Tuple[SqsQueue, List[Dict]]] = {}
+        self.__abandoned_polls: Set[asyncio.Task] = set()
+        self.__wakeup: Optional[asyncio.Event] = None
+        self.__pollers: Dict[str, Tuple[LambdaSqsFunc, asyncio.Task]] = {}
+        self.__poller_wakeups: Dict[str, asyncio.Event] = {}
+        self.__stopping: Optional[asyncio.Event] = None
+        self.__ready: Optional[asyncio.Event] = None
+        self.__failure: Optional[BaseException] = None
+        self.__drain_timeout: Optional[float] = None
+        self.lifecycle = LifecycleTimings()
 
     def add_func(self, func: LambdaSqsFunc):
         if func.name in self.funcs:
             raise Exception(f"Function with name {func.name} already added.")
         self.funcs[func.name] = func
+        # A running simulator starts polling for functions added meanwhile right away.
+        if self.__loop is not None and not self.__loop.is_closed() and self.__wakeup is not None:
+            self.__loop.call_soon_threadsafe(self.__wakeup.set)
 
     def remove_func(self, name: str):
         self.funcs.pop(name)
+        if self.__loop is not None and not self.__loop.is_closed() and name in self.__poller_wakeups:
+            self.__loop.call_soon_threadsafe(self.__poller_wakeups[name].set)
+
+    async def wait_until_ready(self):
+        await self.__get_ready().wait()
+
+    def __get_ready(self) -> asyncio.Event:
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
+        return self.__ready
 
     async def start(self):
+        self.lifecycle = LifecycleTimings(start_requested_at=LifecycleTimings.now())
+        self.__loop = asyncio.get_running_loop()
+        self.__wakeup = asyncio.Event()
+        self.__stopping = asyncio.Event()
+        self.__poller_wakeups = {}
+        self.__failure = None
+        self.__drain_timeout = None
         self.is_started = True
-        while self.is_started:
-            for name, func in self.funcs.items():
-                queue_url = self.__get_sqs_client().get_queue_url(QueueName=func.queue_name)["QueueUrl"]
-                messages = await asyncify(self.__get_sqs_client().receive_message)(
-                    QueueUrl=queue_url,
-                    MaxNumberOfMessages=func.max_number_of_messages,
-                    WaitTimeSeconds=1,
+        self.lifecycle.ready_at = LifecycleTimings.now()
+        self.__get_ready().set()
+
+        # Every function polls its queue in its own task, so a long poll on an empty queue never holds up the others.
+        while self.is_started and self.__failure is None:
+            self.__wakeup.clear()
+            for name, func in list(self.funcs.items()):
+                poller = self.__pollers.get(name)
+                if poller is None or poller[0] is not func:
+                    task = asyncio.ensure_future(self.__run_poller(func))
+                    self.__pollers[name] = (func, task)
+                    task.add_done_callback(self.__on_poller_done)
+            await self.__wakeup.wait()
+
+        # A failed poller stops the other functions too, their in-flight invocations are still drained first.
+        self.is_started = False
+        self.__signal_stop()
+        pollers = [task for _, task in self.__pollers.values()]
+        self.__pollers.clear()
+        try:
+            await asyncio.gather(*pollers, return_exceptions=True)
+            await self.__drain()
+        finally:
+            self.__get_ready().clear()
+            self.lifecycle.stopped_at = LifecycleTimings.now()
+        if self.__failure is not None:
+            raise self.__failure
+
+    async def __run_poller(self, func: LambdaSqsFunc):
+        name = func.name
+        wakeup = self.__poller_wakeups.setdefault(name, asyncio.Event())
+        # Ends once the function is removed or replaced, a replacement gets a poller of its own.
+        while not self.__stopping.is_set() and self.funcs.get(name) is func:
+            wakeup.clear()
+            if len(self.__invocations[name]) >= func.maximum_concurrency:
+                await wakeup.wait()
+                continue
+            throttled_for = self.__throttled_until.get(name, 0) - self.clock.time()
+            if throttled_for > 0:
+                await self.clock.wait(wakeup, throttled_for)
+                continue
+
+            queue = await self.clock.run_io(self.transport.get_queue(func.queue_name))
+            messages = await self.__poll(func, queue)
+            if not messages:
+                continue
+            if self.funcs.get(name) is not func:
+                await self.__release(queue, messages)
+                break
+            if not self.governor.try_acquire(name):
+                await self.__back_off(func, queue, messages)
+                continue
+
+            self.__throttle_backoff.pop(name, None)
+            task = asyncio.ensure_future(self.__invoke(func, queue, messages))
+            self.__invocations[name].add(task)
+            self.__invocation_messages[task] = (queue, messages)
+            task.add_done_callback(self.__on_invocation_done)
+
+    def __on_poller_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None and self.__failure is None:
+            self.__failure = task.exception()
+            self.__wakeup.set()
+
+    async def __poll(self, func: LambdaSqsFunc, queue: SqsQueue) -> List[Dict]:
+        # Stopping must not wait for a long poll to time out. A poll that is still running when the simulator
+        # stops is left behind and whatever it receives goes straight back to the queue.
+        receive = asyncio.ensure_future(self.__receive_batch(func, queue))
+        stopping = asyncio.ensure_future(self.__stopping.wait())
+        await asyncio.wait({receive, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if receive.done():
+            return receive.result()
+
+        def release_late_messages(task: asyncio.Task):
+            self.__abandoned_polls.discard(task)
+            if not task.cancelled() and task.exception() is None and task.result():
+                release = asyncio.ensure_future(self.__release(queue, task.result()))
+                self.__abandoned_polls.add(release)
+                release.add_done_callback(self.__abandoned_polls.discard)
+
+        self.__abandoned_polls.add(receive)
+        receive.add_done_callback(release_late_messages)
+        return []
+
+    async def __drain(self):
+        in_flight = list(self.__invocation_messages)
+        if not in_flight:
+            return
+        done, pending = await asyncio.wait(in_flight, timeout=self.__drain_timeout)
+        self.lifecycle.drained_invocations = len(done)
+        self.lifecycle.abandoned_invocations = len(pending)
+        for task in pending:
+            # The handler thread cannot be interrupted, but its messages are handed back to the queue right away
+            # instead of waiting out the visibility timeout.
+            queue, messages = self.__invocation_messages[task]
+            task.cancel()
+            logger.info(f"Abandoning invocation with {len(messages)} messages after drain timeout")
+            await self.__release(queue, messages)
+
+    async def __release(self, queue: SqsQueue, messages: List[Dict]):
+        await self.clock.run_io(self.transport.release_messages(queue, messages))
+        self.lifecycle.released_messages += len(messages)
+
+    async def __invoke(self, func: LambdaSqsFunc, queue: SqsQueue, messages: List[Dict]):
+        try:
+            records = [
+                Record(
+                    messageId=msg["MessageId"],
+                    receiptHandle=msg["ReceiptHandle"],
+                    body=msg["Body"],
+                    attributes={k: v for k, v in msg.get("Attributes", {}).items() if v is not None},
+                    messageAttributes={},
+                    md5OfBody=msg["MD5OfBody"],
+                    eventSource="aws:sqs",
+                    eventSourceARN=queue.arn,
+                    awsRegion=queue.region,
+                )
+                for msg in messages
+            ]
+            logger.info(f"Invoking {func.name}")
+            parent, queue_wait = sqs_trace_parent(messages) if self.span_collector is not None else (None, None)
+            await invoke_handler(
+                self.clock,
+                "sqs",
+                func,
+                SqsEvent(Records=records),
+                self.recorder,
+                self.span_collector,
+                parent,
+                queue_wait,
+            )
+            await self.clock.run_io(self.transport.delete_messages(queue, messages))
+        finally:
+            self.governor.release(func.name)
+
+    def __on_invocation_done(self, task: asyncio.Task):
+        for name, tasks in self.__invocations.items():
+            if task in tasks:
+                tasks.discard(task)
+                if name in self.__poller_wakeups:
+                    self.__poller_wakeups[name].set()
+        self.__invocation_messages.pop(task, None)
+        if not task.cancelled() and task.exception() is not None and self.__failure is None:
+            self.__failure = task.exception()
+            self.__wakeup.set()
+
+    async def __back_off(self, func: LambdaSqsFunc, queue: SqsQueue, messages: List[Dict]):
+        # Throttled batches go straight back to the queue and the function is not polled until the backoff passes.
+        backoff = min(self.__throttle_backoff.get(func.name, self.throttle_backoff_seconds / 2) * 2, 60)
+        self.__throttle_backoff[func.name] = backoff
+        self.__throttled_until[func.name] = self.clock.time() + backoff
+        logger.info(f"Throttled {func.name}, backing off for {backoff} seconds")
+        await self.__release(queue, messages)
+
+    async def __receive_batch(self, func: LambdaSqsFunc, queue: SqsQueue) -> List[Dict]:
+        # SQS hands out at most 10 messages per receive, larger batches are gathered over several receives
+        # until the batch is full or the batching window has passed.
+        messages = []
+        window_end = self.clock.time() + func.maximum_batching_window_in_seconds
+        while len(messages) < func.max_number_of_messages:
+            time_left = window_end - self.clock.time()
+            if messages and time_left <= 0:
+                break
+            wait_time_seconds = (
+                min(self.wait_time_seconds, math.ceil(time_left)) if messages else self.wait_time_seconds
+            )
+            received = await self.__receive_messages(
+                queue, min(10, func.max_number_of_messages - len(messages)), wait_time_seconds
+            )
+            if not received and not messages:
+                break
+            messages.extend(received)
+        return messages
+
+    async def __receive_messages(self, queue: SqsQueue, max_number_of_messages: int, wait_time_seconds: int):
+        # A virtual clock cannot speed up a long poll inside moto, so it short polls and sleeps on the clock instead.
+        try:
+            messages = await self.clock.run_io(
+                self.transport.receive_messages(
+                    queue, max_number_of_messages, 0 if self.clock.is_virtual else wait_time_seconds
                 )
-                if messages and "Messages" in messages and len(messages["Messages"]) > 0:
-                    records = [
-                        Record(
-                            messageId=msg["MessageId"],
-                            receiptHandle=msg["ReceiptHandle"],
-                            body=msg["Body"],
-                            attributes={},
-                            messageAttributes={},
-                            md5OfBody=msg["MD5OfBody"],
-                            eventSource="sqs?",
-                            eventSourceARN="sqsArn?",
-                            awsRegion="region?",
-                        )
-                        for msg in messages["Messages"]
-                    ]
-                    logger.info(f"Invoking {name}")
-                    func.handler_func(SqsEvent(Records=records), {})
-                    for msg in messages["Messages"]:
-                        self.__get_sqs_client().delete_message(QueueUrl=queue_url, ReceiptHandle=msg["ReceiptHandle"])
-
-    def stop(self):
+            )
+            if self.clock.is_virtual and not messages and wait_time_seconds > 0:
+                await self.clock.sleep(wait_time_seconds)
+                messages = await self.clock.run_io(self.transport.receive_messages(queue, max_number_of_messages, 0))
+        except Exception:
+            # The queue may have been deleted or recreated, look it up again on the next poll.
+            self.transport.forget_queue(queue.name)
+            raise
+        return messages
+
+    def stop(self, drain_timeout: Optional[float] = None):
+        # Stops polling right away and gives in-flight invocations drain_timeout seconds to finish.
+        # Safe to call from a handler thread.
         self.is_started = False
+        self.__drain_timeout = drain_timeout
+        if self.lifecycle.stop_requested_at is None:
+            self.lifecycle.stop_requested_at = LifecycleTimings.now()
+        if self.__loop is not None and not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(self.__signal_stop)
+
+    def __signal_stop(self):
+        self.__wakeup.set()
+        self.__stopping.set()
+        for wakeup in self.__poller_wakeups.values():
+            wakeup.set()
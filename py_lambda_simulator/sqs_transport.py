@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQS accepts at most 10 entries per batch request.
+_MAX_BATCH_ENTRIES = 10
+
+
+@dataclass
+class SqsQueue:
+    name: str
+    url: str
+    arn: str
+    region: str
+
+
+class SqsTransport:
+    """
+    The SQS calls the simulator makes, with queue URL and ARN looked up once per queue and then cached.
+
+    Subclasses only implement _call, which runs a single client operation such as receive_message.
+    """
+
+    def __init__(self):
+        self.__queues: Dict[str, SqsQueue] = {}
+
+    async def _call(self, operation: str, **kwargs) -> Dict:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_queue(self, queue_name: str) -> SqsQueue:
+        if queue_name not in self.__queues:
+            url = (await self._call("get_queue_url", QueueName=queue_name))["QueueUrl"]
+            attributes = await self._call("get_queue_attributes", QueueUrl=url, AttributeNames=["QueueArn"])
+            arn = attributes["Attributes"]["QueueArn"]
+            self.__queues[queue_name] = SqsQueue(name=queue_name, url=url, arn=arn, region=arn.split(":")[3])
+        return self.__queues[queue_name]
+
+    def forget_queue(self, queue_name: str):
+        # For queues that were deleted or recreated, the next get_queue looks them up again.
+        self.__queues.pop(queue_name, None)
+
+    async def receive_messages(
+        self, queue: SqsQueue, max_number_of_messages: int, wait_time_seconds: int
+    ) -> List[Dict]:
+        response = await self._call(
+            "receive_message",
+            QueueUrl=queue.url,
+            MaxNumberOfMessages=max_number_of_messages,
+            WaitTimeSeconds=wait_time_seconds,
+            # Lambda passes every system attribute on to the handler, including the AWSTraceHeader.
+            AttributeNames=["All"],
+        )
+        return response.get("Messages", [])
+
+    async def delete_messages(self, queue: SqsQueue, messages: List[Dict]):
+        for start in range(0, len(messages), _MAX_BATCH_ENTRIES):
+            batch = messages[start : start + _MAX_BATCH_ENTRIES]
+            response = await self._call(
+                "delete_message_batch",
+                QueueUrl=queue.url,
+                Entries=[{"Id": str(i), "ReceiptHandle": msg["ReceiptHandle"]} for i, msg in enumerate(batch)],
+            )
+            for failed in response.get("Failed", []):
+                logger.info(f"Failed to delete message from {queue.name}: {failed.get('Message')}")
+
+    async def release_messages(self, queue: SqsQueue, messages: List[Dict]):
+        # Makes the messages visible again right away instead of after the visibility timeout.
+        for start in range(0, len(messages), _MAX_BATCH_ENTRIES):
+            batch = messages[start : start + _MAX_BATCH_ENTRIES]
+            response = await self._call(
+                "change_message_visibility_batch",
+                QueueUrl=queue.url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": msg["ReceiptHandle"], "VisibilityTimeout": 0}
+                    for i, msg in enumerate(batch)
+                ],
+            )
+            for failed in response.get("Failed", []):
+                logger.info(f"Failed to release message to {queue.name}: {failed.get('Message')}")
+
+
+class BotoSqsTransport(SqsTransport):
+    """
+    Runs blocking boto3 calls in worker threads. Works with moto's in-process mocks as well as a moto server.
+
+    boto3 clients are thread safe, so a single client is shared by every poll, with up to max_pool_connections
+    connections kept open to the endpoint.
+    """
+
+    def __init__(
+        self, endpoint_url: Optional[str] = None, region_name: Optional[str] = None, max_pool_connections: int = 10
+    ):
+        super().__init__()
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.max_pool_connections = max_pool_connections
+        self.__client = None
+
+    def __get_client(self):
+        if self.__client is None:
+            import boto3
+            from botocore.config import Config
+
+            self.__client = boto3.client(
+                "sqs",
+                endpoint_url=self.endpoint_url,
+                region_name=self.region_name,
+                config=Config(max_pool_connections=self.max_pool_connections),
+            )
+        return self.__client
+
+    async def _call(self, operation: str, **kwargs) -> Dict:
+        from asyncer import asyncify
+
+        return await asyncify(getattr(self.__get_client(), operation))(**kwargs)
+
+
+class AioSqsTransport(SqsTransport):
+    """
+    Calls SQS with an aiobotocore client straight from the event loop, so polling many queues does not depend on
+    the size of the thread pool. Requires aiobotocore.
+
+    moto's in-process mocks only patch blocking botocore, point endpoint_url at a moto server instead.
+    Close the transport, or use it as an async context manager, to close its connection pool.
+    """
+
+    def __init__(
+        self, endpoint_url: Optional[str] = None, region_name: Optional[str] = None, max_pool_connections: int = 10
+    ):
+        super().__init__()
+        self.endpoint_url = endpoint_url
+        self.region_name = region_name
+        self.max_pool_connections = max_pool_connections
+        self.__client_context = None
+        self.__client = None
+        self.__client_lock: Optional[asyncio.Lock] = None
+
+    async def __get_client(self):
+        if self.__client_lock is None:
+            self.__client_lock = asyncio.Lock()
+        async with self.__client_lock:
+            if self.__client is None:
+                await self.__create_client()
+        return self.__client
+
+    async def __create_client(self):
+        try:
+            from aiobotocore.config import AioConfig
+            from aiobotocore.session import get_session
+        except ImportError as e:
+            raise Exception("AioSqsTransport requires aiobotocore, install it with pip install aiobotocore.") from e
+
+        self.__client_context = get_session().create_client(
+            "sqs",
+            endpoint_url=self.endpoint_url,
+            region_name=self.region_name,
+            config=AioConfig(max_pool_connections=self.max_pool_connections),
+        )
+        self.__client = await self.__client_context.__aenter__()
+
+    async def _call(self, operation: str, **kwargs) -> Dict:
+        client = await self.__get_client()
+        return await getattr(client, operation)(**kwargs)
+
+    async def close(self):
+        if self.__client_context is not None:
+            context = self.__client_context
+            self.__client_context = None
+            self.__client = None
+            await context.__aexit__(None, None, None)
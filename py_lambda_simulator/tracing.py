@@ -0,0 +1,241 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+TRACE_HEADER = "X-Amzn-Trace-Id"
+# The SQS message system attribute Lambda reads the trace header of a record from.
+SQS_TRACE_ATTRIBUTE = "AWSTraceHeader"
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    trace_id: str
+    parent_id: Optional[str] = None
+    sampled: bool = True
+
+    def to_header(self) -> str:
+        parent = f";Parent={self.parent_id}" if self.parent_id else ""
+        return f"Root={self.trace_id}{parent};Sampled={1 if self.sampled else 0}"
+
+
+def parse_trace_header(header: Optional[str]) -> Optional[TraceContext]:
+    if not header:
+        return None
+    fields = dict(part.strip().split("=", 1) for part in header.split(";") if "=" in part)
+    if "Root" not in fields:
+        return None
+    return TraceContext(trace_id=fields["Root"], parent_id=fields.get("Parent"), sampled=fields.get("Sampled") != "0")
+
+
+def new_trace_id() -> str:
+    return f"1-{int(time.time()):08x}-{os.urandom(12).hex()}"
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    function: str
+    source: str
+    start: float
+    duration: float = 0.0
+    # Seconds the record that triggered the invocation waited in its queue or stream.
+    queue_wait: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
+class SpanCollector:
+    def collect(self, span: Span):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemorySpanCollector(SpanCollector):
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.__lock = threading.Lock()
+
+    def collect(self, span: Span):
+        with self.__lock:
+            self.spans.append(span)
+
+    def get_trace(self, trace_id: str) -> List[Span]:
+        return sorted((span for span in self.spans if span.trace_id == trace_id), key=lambda span: span.start)
+
+    def get_trace_duration(self, trace_id: str) -> float:
+        # From the first record being queued to the last hop finishing.
+        spans = self.get_trace(trace_id)
+        if not spans:
+            return 0.0
+        return max(span.end for span in spans) - min(span.start - (span.queue_wait or 0) for span in spans)
+
+
+class JsonlSpanCollector(SpanCollector):
+    """Appends one JSON line per span."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__file = open(path, "a", encoding="utf-8")
+        self.__lock = threading.Lock()
+
+    def collect(self, span: Span):
+        with self.__lock:
+            self.__file.write(json.dumps(asdict(span)) + "\n")
+            self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+def read_spans(path: str) -> List[Span]:
+    with open(path, encoding="utf-8") as file:
+        return [Span(**json.loads(line)) for line in file if line.strip()]
+
+
+# The trace of the invocation running in this task, handler threads see it as well since asyncify copies the context.
+_current_trace: contextvars.ContextVar[Optional[TraceContext]] = contextvars.ContextVar(
+    "py_lambda_simulator_trace", default=None
+)
+
+
+def get_current_trace() -> Optional[TraceContext]:
+    return _current_trace.get()
+
+
+def start_span(
+    function: str, source: str, parent: Optional[TraceContext], start: float, queue_wait: Optional[float] = None
+) -> Tuple[Span, contextvars.Token]:
+    span = Span(
+        trace_id=parent.trace_id if parent else new_trace_id(),
+        span_id=new_span_id(),
+        parent_id=parent.parent_id if parent else None,
+        function=function,
+        source=source,
+        start=start,
+        queue_wait=queue_wait,
+    )
+    sampled = parent.sampled if parent else True
+    token = _current_trace.set(TraceContext(trace_id=span.trace_id, parent_id=span.span_id, sampled=sampled))
+    return span, token
+
+
+def finish_span(
+    collector: SpanCollector, span: Span, token: contextvars.Token, duration: float, error: Optional[Exception]
+):
+    sampled = _current_trace.get().sampled
+    _current_trace.reset(token)
+    span.duration = duration
+    span.error = repr(error) if error is not None else None
+    if sampled:
+        collector.collect(span)
+
+
+def sqs_trace_parent(messages: List[Dict]) -> Tuple[Optional[TraceContext], Optional[float]]:
+    # A batch is traced as part of its first traced message, the queue wait is that of its oldest message.
+    parent = None
+    sent = []
+    for message in messages:
+        attributes = message.get("Attributes", {})
+        parent = parent or parse_trace_header(attributes.get(SQS_TRACE_ATTRIBUTE))
+        if "SentTimestamp" in attributes:
+            sent.append(int(attributes["SentTimestamp"]) / 1000)
+    # Sent timestamps are set by SQS, so the wait is measured in wall clock time.
+    return parent, max(0.0, time.time() - min(sent)) if sent else None
+
+
+_SQS_SEND_OPERATIONS = ("SendMessage", "SendMessageBatch")
+
+
+def _with_sqs_trace_header(params: Dict[str, Any]) -> Dict[str, Any]:
+    context = _current_trace.get()
+    if context is None:
+        return params
+    attribute = {SQS_TRACE_ATTRIBUTE: {"DataType": "String", "StringValue": context.to_header()}}
+    if "Entries" in params:
+        return {
+            **params,
+            "Entries": [
+                {**entry, "MessageSystemAttributes": {**attribute, **entry.get("MessageSystemAttributes", {})}}
+                for entry in params["Entries"]
+            ],
+        }
+    return {**params, "MessageSystemAttributes": {**attribute, **params.get("MessageSystemAttributes", {})}}
+
+
+def _inject_sqs_trace_header(params: Dict[str, Any], **kwargs):
+    params.update(_with_sqs_trace_header(params))
+
+
+def instrument_client(client):
+    """
+    Makes the SQS messages a client sends from within a traced invocation carry the invocation's trace header.
+
+    Only needed for aiobotocore clients, instrument_botocore already covers every blocking botocore client.
+    """
+    for operation in _SQS_SEND_OPERATIONS:
+        client.meta.events.register(
+            f"before-parameter-build.sqs.{operation}", _inject_sqs_trace_header, unique_id=f"trace-sqs-{operation}"
+        )
+
+
+# Nested instrument_botocore calls share one patch, the original method is put back by the last uninstrument.
+_botocore_lock = threading.Lock()
+_botocore_instrumented = 0
+_original_make_api_call = None
+
+
+def instrument_botocore():
+    """
+    Makes the SQS messages every botocore client sends from within a traced invocation carry the invocation's trace
+    header, including clients created before tracing started such as module level clients in handler modules.
+
+    Patches BaseClient._make_api_call until the matching uninstrument_botocore call. Traced invocations do this
+    themselves for as long as they run, outside of a traced invocation the patched method passes calls through as is.
+    """
+    global _botocore_instrumented, _original_make_api_call
+    from botocore.client import BaseClient
+
+    with _botocore_lock:
+        _botocore_instrumented += 1
+        if _botocore_instrumented > 1:
+            return
+        make_api_call = _original_make_api_call = BaseClient._make_api_call
+
+        def traced_make_api_call(client, operation_name: str, api_params: Dict[str, Any]):
+            if operation_name in _SQS_SEND_OPERATIONS and client.meta.service_model.service_name == "sqs":
+                api_params = _with_sqs_trace_header(api_params)
+            return make_api_call(client, operation_name, api_params)
+
+        traced_make_api_call.traces_sqs = True
+        BaseClient._make_api_call = traced_make_api_call
+
+
+def uninstrument_botocore():
+    global _botocore_instrumented, _original_make_api_call
+    from botocore.client import BaseClient
+
+    with _botocore_lock:
+        if _botocore_instrumented == 0:
+            return
+        _botocore_instrumented -= 1
+        if _botocore_instrumented > 0:
+            return
+        # Left in place if someone else patched the method since, it passes calls through without a trace anyway.
+        if getattr(BaseClient._make_api_call, "traces_sqs", False):
+            BaseClient._make_api_call = _original_make_api_call
+        _original_make_api_call = None
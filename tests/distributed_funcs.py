@@ -0,0 +1,21 @@
+import json
+import os
+import time
+
+import boto3
+
+from py_lambda_simulator.lambda_events import SqsEvent
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc
+
+
+# Loaded by the worker processes of test_distributed, results go to a queue the test reads.
+def handler(event: SqsEvent, context):
+    client = boto3.client("sqs", endpoint_url=os.environ["DISTRIBUTED_ENDPOINT_URL"])
+    queue_url = client.get_queue_url(QueueName="results-queue")["QueueUrl"]
+    for record in event["Records"]:
+        time.sleep(0.05)
+        result = {"n": json.loads(record["body"])["n"], "pid": os.getpid()}
+        client.send_message(QueueUrl=queue_url, MessageBody=json.dumps(result))
+
+
+FUNCS = [LambdaSqsFunc(name="distributed-func", queue_name="work-queue", handler_func=handler, maximum_concurrency=4)]
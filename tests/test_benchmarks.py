@@ -0,0 +1,22 @@
+import json
+
+from py_lambda_simulator.benchmarks import main
+
+
+def test_should_write_benchmark_results_as_json(tmp_path, capsys):
+    output = tmp_path / "results.json"
+
+    main(["--quick", "--only", "events,lifecycle", "--output", str(output)])
+    main(["--quick", "--only", "events", "--compare", str(output)])
+
+    results = json.loads(output.read_text())["results"]
+    assert [r["name"] for r in results] == [
+        "api_gateway_event_construction",
+        "sqs_event_construction",
+        "api_gateway_event_decoding",
+        "api_gateway_event_lazy_decoding",
+        "sqs_event_decoding",
+        "simulator_start_stop",
+    ]
+    assert results[0]["metrics"]["ops_per_second"] > 0
+    assert "ops_per_second" in capsys.readouterr().out
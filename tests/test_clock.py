@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+
+from py_lambda_simulator.clock import VirtualClock
+
+
+@pytest.mark.asyncio
+async def test_should_advance_virtual_time_when_idle():
+    clock = VirtualClock(start=100)
+    woken = []
+
+    async def sleeper(name, delay):
+        await clock.sleep(delay)
+        woken.append((name, clock.time()))
+
+    started = time.monotonic()
+    await asyncio.gather(sleeper("b", 3600), sleeper("a", 60), sleeper("c", 3600))
+
+    assert woken == [("a", 160), ("b", 3700), ("c", 3700)]
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_should_not_advance_virtual_time_while_threads_run():
+    clock = VirtualClock()
+
+    async def worker():
+        await clock.run_in_thread(time.sleep, 0.1)
+        return clock.time()
+
+    async def sleeper():
+        await clock.sleep(10)
+        return clock.time()
+
+    assert await asyncio.gather(worker(), sleeper()) == [0, 10]
+
+
+@pytest.mark.asyncio
+async def test_should_wait_for_event_or_virtual_timeout():
+    clock = VirtualClock()
+    event = asyncio.Event()
+
+    assert not await clock.wait(event, 30)
+    assert clock.time() == 30
+
+    asyncio.get_running_loop().call_soon(event.set)
+    assert await clock.wait(event, 30)
+    assert clock.time() == 30
+
+
+@pytest.mark.asyncio
+async def test_should_reject_loops_it_cannot_tell_are_idle(monkeypatch):
+    class UnsupportedLoop:
+        pass
+
+    clock = VirtualClock()
+    monkeypatch.setattr(asyncio, "get_running_loop", UnsupportedLoop)
+    try:
+        with pytest.raises(Exception, match="not UnsupportedLoop"):
+            await clock.sleep(1)
+    finally:
+        monkeypatch.undo()
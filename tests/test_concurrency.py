@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from py_lambda_simulator.clock import VirtualClock
+from py_lambda_simulator.concurrency import ConcurrencyGovernor
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, ScheduledEvent, SqsEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator, Simulator
+from py_lambda_simulator.http_lambda_simulator import LambdaHttpFunc
+from py_lambda_simulator.scheduled_lambda_simulator import LambdaScheduledFunc, ScheduledLambdaSimulator
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
+
+
+def test_should_throttle_when_unreserved_concurrency_is_used_up():
+    governor = ConcurrencyGovernor(account_limit=3, minimum_unreserved_concurrency=1)
+    governor.set_reserved_concurrency("reserved", 1)
+    governor.set_provisioned_concurrency("provisioned", 1)
+
+    assert governor.get_account_concurrency().unreserved_limit == 1
+    assert governor.try_acquire("reserved")
+    assert not governor.try_acquire("reserved")
+    assert governor.try_acquire("provisioned")
+    assert governor.try_acquire("provisioned")
+    assert not governor.try_acquire("other")
+
+    governor.release("provisioned")
+    assert governor.try_acquire("other")
+
+    provisioned = governor.get_function_concurrency("provisioned")
+    assert provisioned.invocations == 2
+    assert provisioned.provisioned_invocations == 1
+    assert provisioned.peak_in_flight == 2
+    assert governor.get_account_concurrency().throttles == 2
+    assert governor.get_account_concurrency().in_flight == 3
+
+
+def test_should_keep_minimum_unreserved_concurrency():
+    governor = ConcurrencyGovernor(account_limit=1000)
+    governor.set_reserved_concurrency("reserved", 900)
+
+    with pytest.raises(Exception):
+        governor.set_reserved_concurrency("greedy", 1)
+    with pytest.raises(Exception):
+        governor.set_provisioned_concurrency("reserved", 901)
+
+
+@pytest.mark.asyncio
+async def test_should_throttle_http_while_sqs_uses_the_account_pool(aiohttp_client):
+    aws_simulator = AwsSimulator()
+    simulator = Simulator(governor=ConcurrencyGovernor(account_limit=1, minimum_unreserved_concurrency=0))
+    client = await aiohttp_client(simulator.http.app)
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    sqs_handler_started = threading.Event()
+    release_sqs_handler = threading.Event()
+
+    def sqs_handler(event: SqsEvent, context):
+        sqs_handler_started.set()
+        release_sqs_handler.wait(5)
+        simulator.sqs.stop()
+
+    def http_handler(event: ApiGatewayProxyEvent, context):
+        return {"statusCode": 200}
+
+    simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+    simulator.add_func(LambdaHttpFunc(name="test-http-lambda", method="GET", path="/http", handler_func=http_handler))
+    aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+
+    async def call_http_lambda():
+        while not sqs_handler_started.is_set():
+            await asyncio.sleep(0.01)
+        throttled = await client.get("/http")
+        release_sqs_handler.set()
+        assert throttled.status == 429
+        assert throttled.headers["x-amzn-ErrorType"] == "TooManyRequestsException"
+
+        while simulator.governor.get_account_concurrency().in_flight:
+            await asyncio.sleep(0.01)
+        resp = await client.get("/http")
+        assert resp.status == 200
+        await simulator.http.stop()
+
+    await asyncio.gather(simulator.sqs.start(), simulator.http.start(), call_http_lambda())
+    aws_simulator.shutdown()
+
+    assert simulator.governor.get_function_concurrency("test-http-lambda").throttles == 1
+    assert simulator.governor.get_function_concurrency("test-sqs-lambda").invocations == 1
+
+
+@pytest.mark.asyncio
+async def test_should_redeliver_throttled_sqs_message_once_a_slot_frees_up():
+    aws_simulator = AwsSimulator()
+    clock = VirtualClock()
+    governor = ConcurrencyGovernor(account_limit=1, minimum_unreserved_concurrency=0)
+    simulator = SqsLambdaSimulator(clock=clock, governor=governor)
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    received = []
+
+    def sqs_handler(event: SqsEvent, context):
+        received.append((clock.time(), int(event["Records"][0]["attributes"]["ApproximateReceiveCount"])))
+        simulator.stop()
+
+    simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+    aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+    # Another function holds the only slot of the account for the first ten seconds.
+    assert governor.try_acquire("other")
+
+    async def free_slot_later():
+        await clock.sleep(10)
+        governor.release("other")
+
+    await asyncio.gather(simulator.start(), free_slot_later())
+    aws_simulator.shutdown()
+
+    # Backing off for 1, 2, 4 and 8 seconds, the first poll after the slot frees up is at 15 seconds.
+    assert received == [(15, 5)]
+    assert governor.get_function_concurrency("test-sqs-lambda").throttles == 4
+    assert simulator.lifecycle.released_messages == 4
+
+
+@pytest.mark.asyncio
+async def test_should_retry_throttled_scheduled_event_until_maximum_event_age():
+    clock = VirtualClock()
+    governor = ConcurrencyGovernor(account_limit=1, minimum_unreserved_concurrency=0)
+    simulator = ScheduledLambdaSimulator(clock=clock, governor=governor)
+    invoked_at = []
+
+    def scheduled_handler(event: ScheduledEvent, context):
+        invoked_at.append(clock.time())
+        simulator.stop()
+
+    simulator.add_func(
+        LambdaScheduledFunc(
+            name="test-scheduled-lambda",
+            schedule_expression="rate(1 minute)",
+            handler_func=scheduled_handler,
+            maximum_event_age_in_seconds=60,
+        )
+    )
+    assert governor.try_acquire("other")
+
+    async def free_slot_after_first_event_is_dropped():
+        await clock.sleep(100)
+        governor.release("other")
+
+    await asyncio.gather(simulator.start(), free_slot_after_first_event_is_dropped())
+
+    # The event fired at 60 is retried after 1, 2, 4, 8 and 16 seconds, the next retry would be older than 60 seconds.
+    state = simulator.states["test-scheduled-lambda"]
+    assert state.dropped_count == 1
+    assert governor.get_function_concurrency("test-scheduled-lambda").throttles == 6
+    assert invoked_at == [120]
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+from py_lambda_simulator.distributed import Coordinator, DistributedWorker
+from py_lambda_simulator.kinesis_lambda_simulator import LambdaKinesisFunc
+from py_lambda_simulator.lambda_events import KinesisEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+
+
+async def _wait_for(condition, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for condition"
+        await asyncio.sleep(0.05)
+
+
+def test_should_balance_leases_between_workers():
+    coordinator = Coordinator()
+    resources = [f"sqs/f/{slot}" for slot in range(4)]
+
+    first = coordinator.handle_request({"op": "heartbeat", "worker": "a", "resources": resources})
+    second = coordinator.handle_request({"op": "heartbeat", "worker": "b", "resources": resources})
+    assert sorted(first["leases"]) == resources
+    assert second["leases"] == {}
+
+    first = coordinator.handle_request({"op": "heartbeat", "worker": "a", "resources": resources})
+    second = coordinator.handle_request({"op": "heartbeat", "worker": "b", "resources": resources})
+    assert sorted(first["leases"]) == resources[:2]
+    assert sorted(second["leases"]) == resources[2:]
+
+    coordinator.handle_request({"op": "leave", "worker": "a"})
+    second = coordinator.handle_request({"op": "heartbeat", "worker": "b", "resources": resources})
+    assert sorted(second["leases"]) == resources
+
+
+def test_should_hand_over_checkpoints_and_expire_silent_workers():
+    coordinator = Coordinator(lease_seconds=0.1)
+    resources = ["kinesis/f/shardId-000000000000"]
+    coordinator.handle_request({"op": "heartbeat", "worker": "a", "resources": resources})
+    coordinator.handle_request(
+        {"op": "heartbeat", "worker": "a", "resources": resources, "checkpoints": {resources[0]: "42"}}
+    )
+    # Checkpoints of shards a worker does not hold are ignored.
+    coordinator.handle_request(
+        {"op": "heartbeat", "worker": "b", "resources": resources, "checkpoints": {resources[0]: "99"}}
+    )
+
+    time.sleep(0.2)
+    response = coordinator.handle_request({"op": "heartbeat", "worker": "b", "resources": resources})
+
+    assert response["leases"] == {resources[0]: "42"}
+    assert list(coordinator.workers) == ["b"]
+
+
+def test_should_aggregate_metrics_of_all_workers():
+    coordinator = Coordinator()
+    for worker, invocations in (("a", 3), ("b", 4)):
+        coordinator.handle_request(
+            {"op": "heartbeat", "worker": worker, "resources": [], "metrics": {"f": {"invocations": invocations}}}
+        )
+    coordinator.handle_request({"op": "leave", "worker": "a"})
+
+    metrics = coordinator.handle_request({"op": "metrics"})
+
+    assert metrics["functions"] == {"f": {"invocations": 7}}
+    assert set(metrics["workers"]) == {"a", "b"}
+    assert coordinator.handle_request({"op": "unknown"}) == {"error": "Unknown operation unknown."}
+
+
+@pytest.mark.asyncio
+async def test_should_stop_coordinator_while_workers_are_connected():
+    coordinator = Coordinator()
+    await coordinator.start()
+    reader, writer = await asyncio.open_connection("127.0.0.1", coordinator.port)
+    writer.write(json.dumps({"op": "heartbeat", "worker": "a", "resources": ["sqs/f/0"]}).encode("utf-8") + b"\n")
+    await writer.drain()
+    assert json.loads(await reader.readline()) == {"leases": {"sqs/f/0": None}}
+
+    await asyncio.wait_for(coordinator.stop(), 5)
+
+    assert await asyncio.wait_for(reader.read(), 5) == b""
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_should_split_shards_between_workers_and_resume_from_checkpoint():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name", shard_count=2)
+    client = aws_simulator.get_kinesis_client()
+    coordinator = Coordinator()
+    await coordinator.start()
+    received = []
+
+    def kinesis_handler(event: KinesisEvent, context):
+        received.extend(r["kinesis"]["partitionKey"] for r in event["Records"])
+
+    func = LambdaKinesisFunc(
+        name="f", stream_name="stream-name", handler_func=kinesis_handler, starting_position="TRIM_HORIZON"
+    )
+    workers = [
+        DistributedWorker(f"127.0.0.1:{coordinator.port}", [func], worker_id=worker_id, heartbeat_seconds=0.05)
+        for worker_id in ("a", "b")
+    ]
+    for worker in workers:
+        worker.kinesis.poll_interval_seconds = 0.05
+        await worker.start()
+    await _wait_for(lambda: sorted(coordinator.get_metrics()["leases"].values()) == ["a", "b"])
+
+    keys = [f"key-{i}" for i in range(20)]
+    client.put_records(StreamName="stream-name", Records=[{"Data": b"{}", "PartitionKey": key} for key in keys])
+    await _wait_for(lambda: len(received) == 20)
+    await _wait_for(lambda: len(coordinator.checkpoints) == 2)
+
+    await workers[0].stop()
+    await _wait_for(lambda: list(coordinator.get_metrics()["leases"].values()) == ["b", "b"])
+    client.put_records(StreamName="stream-name", Records=[{"Data": b"{}", "PartitionKey": key} for key in keys])
+    await _wait_for(lambda: len(received) == 40)
+    await asyncio.sleep(0.2)
+    await workers[1].stop()
+    await coordinator.stop()
+    aws_simulator.shutdown()
+
+    assert sorted(received) == sorted(keys * 2)
+    assert coordinator.get_metrics()["functions"]["f"]["records"] == 40
+
+
+@pytest.mark.asyncio
+async def test_should_share_queue_between_worker_processes(moto_server, monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    aws_simulator = AwsSimulator(endpoint_url=moto_server)
+    aws_simulator.create_sqs_queue("work-queue")
+    results_queue = aws_simulator.create_sqs_queue("results-queue")
+    sqs_client = aws_simulator.get_sqs_client()
+    coordinator = Coordinator(lease_seconds=5)
+    await coordinator.start()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root, "DISTRIBUTED_ENDPOINT_URL": moto_server}
+    command = [sys.executable, "-m", "py_lambda_simulator.distributed", "worker"]
+    command += ["--coordinator", f"127.0.0.1:{coordinator.port}", "--funcs", "tests.distributed_funcs:FUNCS"]
+    command += ["--endpoint-url", moto_server, "--heartbeat-seconds", "0.2"]
+    processes = [await asyncio.create_subprocess_exec(*command, env=env) for _ in range(2)]
+    results = {}
+    try:
+        # Wait for the slots to be split, then give both workers the same queue to contend for.
+        await _wait_for(lambda: len(set(coordinator.get_metrics()["leases"].values())) == 2)
+        aws_simulator.seed_sqs_queue("work-queue", [{"n": i} for i in range(40)])
+
+        def receive():
+            response = sqs_client.receive_message(QueueUrl=results_queue["queue_url"], MaxNumberOfMessages=10)
+            for message in response.get("Messages", []):
+                result = json.loads(message["Body"])
+                results[result["n"]] = result["pid"]
+                sqs_client.delete_message(QueueUrl=results_queue["queue_url"], ReceiptHandle=message["ReceiptHandle"])
+
+        deadline = time.monotonic() + 60
+        while len(results) < 40 and time.monotonic() < deadline:
+            await asyncio.get_running_loop().run_in_executor(None, receive)
+    finally:
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+        for process in processes:
+            await process.wait()
+        await coordinator.stop()
+
+    assert sorted(results) == list(range(40))
+    assert set(results.values()) == {process.pid for process in processes}
+    assert coordinator.get_metrics()["functions"]["distributed-func"]["invocations"] >= 40
+    assert [process.returncode for process in processes] == [0, 0]
@@ -0,0 +1,142 @@
+import copy
+import json
+import pickle
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pytest
+
+from py_lambda_simulator.event_decoders import decode, encode, encode_json, get_decoder
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, Identity, RequestContext, ScheduledEvent, SqsEvent
+
+IDENTITY = {
+    "caller": "caller",
+    "user": "user",
+    "apiKey": "apiKey",
+    "userArn": "userArn",
+    "cognitoAuthenticationType": "type",
+    "userAgent": "agent",
+    "cognitoIdentityPoolId": "pool",
+    "cognitoAuthenticationProvider": "provider",
+    "sourceIp": "127.0.0.1",
+    "accountId": "accountId",
+    "cognitoIdentityId": "identityId",
+}
+
+API_GATEWAY_EVENT = {
+    "body": {"key": "value"},
+    "resource": "/http",
+    "path": "/http",
+    "headers": {"Content-Type": "application/json"},
+    "requestContext": {
+        "stage": "stage",
+        "identity": IDENTITY,
+        "resourceId": "resId",
+        "apiId": "apiId",
+        "resourcePath": "/http",
+        "httpMethod": "POST",
+        "requestId": "reqId",
+        "accountId": "accId",
+    },
+    "queryStringParameters": {},
+    "pathParameters": {},
+    "httpMethod": "POST",
+    "stageVariables": {},
+}
+
+SQS_EVENT = {
+    "Records": [
+        {
+            "messageId": "id",
+            "receiptHandle": "handle",
+            "body": '{"key": "value"}',
+            "attributes": {},
+            "messageAttributes": {},
+            "md5OfBody": "md5",
+            "eventSource": "aws:sqs",
+            "eventSourceARN": "arn:aws:sqs:us-east-1:123456789012:queue-name",
+            "awsRegion": "us-east-1",
+        }
+    ]
+}
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_should_decode_nested_api_gateway_event(lazy):
+    event = decode(ApiGatewayProxyEvent, {**API_GATEWAY_EVENT, "unknown": 1}, lazy=lazy)
+
+    assert isinstance(event, ApiGatewayProxyEvent)
+    assert not hasattr(event, "__dict__")
+    assert event.requestContext == RequestContext(
+        **{**API_GATEWAY_EVENT["requestContext"], "identity": Identity(**IDENTITY)}
+    )
+    assert event.requestContext.identity.sourceIp == "127.0.0.1"
+    assert encode(event) == API_GATEWAY_EVENT
+
+
+def test_should_decode_nested_fields_lazily():
+    event = decode(ApiGatewayProxyEvent, json.dumps(API_GATEWAY_EVENT).encode(), lazy=True)
+    eager = decode(ApiGatewayProxyEvent, API_GATEWAY_EVENT)
+
+    assert event._raw_requestContext == API_GATEWAY_EVENT["requestContext"]
+    first = event.requestContext
+    assert event.requestContext is first
+    assert event == eager and eager == event
+    assert type(pickle.loads(pickle.dumps(event))) is ApiGatewayProxyEvent
+    assert copy.deepcopy(event) == eager
+
+    event.requestContext = None
+    assert event.requestContext is None
+
+
+def test_should_decode_and_encode_typed_dicts():
+    assert decode(SqsEvent, json.dumps(SQS_EVENT)) == SQS_EVENT
+    assert json.loads(encode_json(decode(SqsEvent, SQS_EVENT), SqsEvent)) == SQS_EVENT
+
+    scheduled = {
+        "version": "0",
+        "id": "id",
+        "detail-type": "Scheduled Event",
+        "source": "aws.events",
+        "account": "123456789012",
+        "time": "2022-01-01T00:00:00Z",
+        "region": "us-east-1",
+        "resources": [],
+        "detail": {},
+    }
+    assert decode(ScheduledEvent, scheduled) == scheduled
+
+
+def test_should_cache_decoders():
+    assert get_decoder(ApiGatewayProxyEvent) is get_decoder(ApiGatewayProxyEvent)
+    assert get_decoder(ApiGatewayProxyEvent) is not get_decoder(ApiGatewayProxyEvent, lazy=True)
+
+
+def test_should_report_missing_field():
+    with pytest.raises(Exception, match="Missing field resourceId decoding RequestContext"):
+        decode(ApiGatewayProxyEvent, {**API_GATEWAY_EVENT, "requestContext": {"stage": "stage", "identity": None}})
+
+
+@dataclass
+class Item:
+    name: str
+    tags: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Order:
+    items: List[Item]
+    by_name: Dict[str, Item]
+    note: Optional[str]
+    total: int = 0
+
+    def __post_init__(self):
+        self.total = len(self.items)
+
+
+def test_should_decode_user_dataclasses_with_defaults_and_post_init():
+    order = decode(Order, {"items": [{"name": "a"}], "by_name": {"b": {"name": "b", "tags": ["x"]}}, "note": None})
+
+    assert order == Order(items=[Item("a")], by_name={"b": Item("b", ["x"])}, note=None)
+    assert order.total == 1
+    assert encode(order)["by_name"] == {"b": {"name": "b", "tags": ["x"]}}
@@ -1,5 +1,9 @@
 import asyncio
 import json
+import threading
+import time
+
+import aiohttp
 
 from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent
 from py_lambda_simulator.lambda_simulator import (
@@ -123,3 +127,53 @@ async def test_should_invoke_pure_lambda_func_on_post(aiohttp_client):
 
     await asyncio.gather(simulator.start(), async_assert())
     assert called["has_been_called"]
+
+
+async def _start_slow_request(handler):
+    simulator = HttpLambdaSimulator(host="127.0.0.1", port=0)
+    shutdowns = []
+    simulator.app.on_shutdown.append(lambda app: asyncio.sleep(0, shutdowns.append(app)))
+    handler_started = threading.Event()
+
+    def slow_handler(event: ApiGatewayProxyEvent, context):
+        handler_started.set()
+        handler()
+        return {"statusCode": 200}
+
+    simulator.add_func(LambdaHttpFunc(name="test-http-lambda", method="GET", path="/slow", handler_func=slow_handler))
+    await simulator.start()
+    session = aiohttp.ClientSession()
+    request = asyncio.ensure_future(session.get(f"http://127.0.0.1:{simulator.port}/slow"))
+    while not handler_started.is_set():
+        await asyncio.sleep(0.01)
+    return simulator, session, request, shutdowns
+
+
+async def test_should_drain_in_flight_requests_on_stop():
+    simulator, session, request, shutdowns = await _start_slow_request(lambda: time.sleep(0.3))
+
+    await simulator.stop(drain_timeout=5)
+    resp = await request
+    await session.close()
+
+    assert resp.status == 200
+    assert simulator.lifecycle.drained_invocations == 1
+    assert simulator.lifecycle.abandoned_invocations == 0
+    assert len(shutdowns) == 1
+
+
+async def test_should_abandon_requests_exceeding_drain_timeout():
+    release_handler = threading.Event()
+    simulator, session, request, shutdowns = await _start_slow_request(lambda: release_handler.wait(5))
+
+    started = time.monotonic()
+    await simulator.stop(drain_timeout=0.1)
+    stopped_after = time.monotonic() - started
+    await asyncio.gather(request, return_exceptions=True)
+    await session.close()
+    release_handler.set()
+
+    assert stopped_after < 2
+    assert simulator.lifecycle.drained_invocations == 0
+    assert simulator.lifecycle.abandoned_invocations == 1
+    assert len(shutdowns) == 1
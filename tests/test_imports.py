@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["aiohttp", "asyncer", "boto3", "botocore", "moto"]
+
+
+def _imported_after(statement: str):
+    code = f"import json, sys\n{statement}\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        ("import py_lambda_simulator.lambda_simulator", []),
+        ("from py_lambda_simulator.lambda_simulator import Simulator, AwsSimulator", []),
+        ("from py_lambda_simulator.lambda_simulator import SqsLambdaSimulator, LambdaSqsFunc", []),
+        ("from py_lambda_simulator.scheduled_lambda_simulator import LambdaScheduledFunc", []),
+        ("from py_lambda_simulator.lambda_simulator import LambdaHttpFunc", ["aiohttp"]),
+        (
+            "from py_lambda_simulator.lambda_simulator import Simulator\n"
+            "from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc\n"
+            "Simulator().add_func(LambdaSqsFunc(name='f', queue_name='q', handler_func=print))",
+            [],
+        ),
+    ],
+)
+def test_should_import_dependencies_only_when_used(statement, expected):
+    assert _imported_after(statement) == expected
+
+
+@pytest.mark.parametrize("services, expected", [("", True), ("services=()", False)])
+def test_should_start_baseline_aws_mocks_unless_lazy(services, expected):
+    statement = (
+        "import json, os, sys\n"
+        "os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')\n"
+        "from py_lambda_simulator.lambda_simulator import AwsSimulator\n"
+        f"AwsSimulator({services}).create_sqs_queue('queue-name')\n"
+        "print(json.dumps(any(m.startswith('moto.dynamodb') for m in sys.modules)))"
+    )
+    output = subprocess.run([sys.executable, "-c", statement], check=True, capture_output=True, text=True).stdout
+    assert json.loads(output.splitlines()[-1]) is expected
@@ -0,0 +1,263 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from py_lambda_simulator.clock import VirtualClock
+from py_lambda_simulator.lambda_events import KinesisEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator, Simulator
+from py_lambda_simulator.kinesis_lambda_simulator import KinesisLambdaSimulator, LambdaKinesisFunc
+
+
+def _put_records(aws_simulator: AwsSimulator, stream_name: str, records):
+    aws_simulator.get_kinesis_client().put_records(
+        StreamName=stream_name,
+        Records=[{"Data": json.dumps(data).encode(), "PartitionKey": key} for key, data in records],
+    )
+
+
+def _payloads(event: KinesisEvent):
+    return [json.loads(base64.b64decode(r["kinesis"]["data"])) for r in event["Records"]]
+
+
+def _stop_after(simulator: KinesisLambdaSimulator, received: list, count: int):
+    if len(received) >= count:
+        simulator.stop()
+
+
+@pytest.mark.asyncio
+async def test_should_invoke_lambda_func_with_records_in_shard_order():
+    aws_simulator = AwsSimulator()
+    stream = aws_simulator.create_kinesis_stream("stream-name", shard_count=2)
+    _put_records(aws_simulator, "stream-name", [(f"key-{i % 3}", {"n": i}) for i in range(9)])
+    simulator = KinesisLambdaSimulator()
+    simulator.poll_interval_seconds = 0.05
+    received = []
+
+    def kinesis_handler(event: KinesisEvent, context):
+        record = event["Records"][0]
+        assert record["eventSource"] == "aws:kinesis"
+        assert record["eventSourceARN"] == stream["stream_arn"]
+        assert record["awsRegion"] == "us-east-1"
+        received.extend((r["kinesis"]["partitionKey"], p["n"]) for r, p in zip(event["Records"], _payloads(event)))
+        _stop_after(simulator, received, 9)
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="test-kinesis-lambda",
+            stream_name="stream-name",
+            handler_func=kinesis_handler,
+            starting_position="TRIM_HORIZON",
+        )
+    )
+
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    assert sorted(n for _, n in received) == list(range(9))
+    for key in ("key-0", "key-1", "key-2"):
+        numbers = [n for k, n in received if k == key]
+        assert numbers == sorted(numbers)
+    shards = simulator.shards["test-kinesis-lambda"]
+    assert len(shards) == 2
+    assert sum(state.records for state in shards.values()) == 9
+
+
+@pytest.mark.asyncio
+async def test_should_resume_from_checkpoint_after_restart():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name")
+    _put_records(aws_simulator, "stream-name", [("key", {"n": i}) for i in range(3)])
+    simulator = KinesisLambdaSimulator()
+    simulator.poll_interval_seconds = 0.05
+    received = []
+    expected = [3]
+
+    def kinesis_handler(event: KinesisEvent, context):
+        received.extend(p["n"] for p in _payloads(event))
+        _stop_after(simulator, received, expected[0])
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="test-kinesis-lambda",
+            stream_name="stream-name",
+            handler_func=kinesis_handler,
+            starting_position="TRIM_HORIZON",
+        )
+    )
+    await asyncio.wait_for(simulator.start(), 10)
+    _put_records(aws_simulator, "stream-name", [("key", {"n": i}) for i in range(3, 5)])
+    expected[0] = 5
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    assert received == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_should_process_lanes_concurrently_with_parallelization_factor():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name")
+    _put_records(aws_simulator, "stream-name", [(f"key-{i}", {"n": i}) for i in range(40)])
+    simulator = KinesisLambdaSimulator()
+    simulator.poll_interval_seconds = 0.05
+    received = []
+    lock = threading.Lock()
+
+    def kinesis_handler(event: KinesisEvent, context):
+        time.sleep(0.05)
+        with lock:
+            received.extend(_payloads(event))
+            _stop_after(simulator, received, 40)
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="test-kinesis-lambda",
+            stream_name="stream-name",
+            handler_func=kinesis_handler,
+            starting_position="TRIM_HORIZON",
+            batch_size=5,
+            parallelization_factor=4,
+        )
+    )
+
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    assert len(received) == 40
+    assert simulator.governor.get_function_concurrency("test-kinesis-lambda").peak_in_flight > 1
+
+
+@pytest.mark.asyncio
+async def test_should_bisect_failing_batch_and_drop_poison_record():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name")
+    _put_records(aws_simulator, "stream-name", [("key", {"n": i, "poison": i == 5}) for i in range(8)])
+    simulator = KinesisLambdaSimulator()
+    simulator.poll_interval_seconds = 0.05
+    simulator.retry_backoff_seconds = 0
+    processed = []
+
+    def kinesis_handler(event: KinesisEvent, context):
+        payloads = _payloads(event)
+        if any(p["poison"] for p in payloads):
+            raise Exception("Poison record")
+        processed.extend(p["n"] for p in payloads)
+        _stop_after(simulator, processed, 7)
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="test-kinesis-lambda",
+            stream_name="stream-name",
+            handler_func=kinesis_handler,
+            starting_position="TRIM_HORIZON",
+            bisect_batch_on_function_error=True,
+            maximum_retry_attempts=1,
+        )
+    )
+
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    assert processed == [0, 1, 2, 3, 4, 6, 7]
+    state = simulator.shards["test-kinesis-lambda"]["shardId-000000000000"]
+    assert state.dropped_records == 1
+    assert state.bisect_count == 3
+    # 8, 4, 2 and 1 records, then the single poison record once more.
+    assert state.error_count == 5
+
+
+@pytest.mark.asyncio
+async def test_should_report_iterator_age():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name")
+    _put_records(aws_simulator, "stream-name", [("key", {"n": 0})])
+    await asyncio.sleep(0.2)
+    simulator = KinesisLambdaSimulator()
+    ages = []
+
+    def kinesis_handler(event: KinesisEvent, context):
+        ages.append(simulator.get_iterator_age("test-kinesis-lambda"))
+        simulator.stop()
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="test-kinesis-lambda",
+            stream_name="stream-name",
+            handler_func=kinesis_handler,
+            starting_position="TRIM_HORIZON",
+        )
+    )
+
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    assert ages[0] >= 0.2
+    assert simulator.get_max_iterator_age("test-kinesis-lambda") == ages[0]
+    assert simulator.get_iterator_age("unknown") == 0.0
+
+
+@pytest.mark.asyncio
+async def test_should_retry_on_virtual_clock_until_handler_succeeds():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name")
+    _put_records(aws_simulator, "stream-name", [("key", {"n": 0})])
+    clock = VirtualClock()
+    simulator = KinesisLambdaSimulator(clock=clock)
+    attempts = []
+
+    def kinesis_handler(event: KinesisEvent, context):
+        attempts.append(clock.time())
+        if len(attempts) < 3:
+            raise Exception("Not yet")
+        simulator.stop()
+
+    simulator.add_func(
+        LambdaKinesisFunc(
+            name="test-kinesis-lambda",
+            stream_name="stream-name",
+            handler_func=kinesis_handler,
+            starting_position="TRIM_HORIZON",
+        )
+    )
+
+    started = time.monotonic()
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    assert attempts == [0.0, 1.0, 2.0]
+    assert time.monotonic() - started < 10
+    assert simulator.shards["test-kinesis-lambda"]["shardId-000000000000"].checkpoint is not None
+
+
+def test_should_reject_invalid_parallelization_factor():
+    simulator = KinesisLambdaSimulator()
+    with pytest.raises(Exception):
+        simulator.add_func(LambdaKinesisFunc(name="f", stream_name="s", handler_func=print, parallelization_factor=11))
+
+
+@pytest.mark.asyncio
+async def test_should_run_kinesis_func_in_simulator():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_kinesis_stream("stream-name")
+    simulator = Simulator()
+    received = []
+
+    def kinesis_handler(event: KinesisEvent, context):
+        received.extend(_payloads(event))
+
+    simulator.add_func(LambdaKinesisFunc(name="f", stream_name="stream-name", handler_func=kinesis_handler))
+    simulator.kinesis.poll_interval_seconds = 0.05
+    await simulator.start()
+    _put_records(aws_simulator, "stream-name", [("key", {"n": 1})])
+    for _ in range(100):
+        if received:
+            break
+        await asyncio.sleep(0.05)
+    await simulator.stop()
+    aws_simulator.shutdown()
+
+    assert received == [{"n": 1}]
@@ -1,4 +1,7 @@
 import asyncio
+import socket
+import threading
+import time
 
 import boto3
 import pytest
@@ -10,6 +13,7 @@ from py_lambda_simulator.lambda_simulator import (
     LambdaHttpFunc,
     LambdaPureHttpFunc,
     AwsSimulator,
+    Simulator,
 )
 from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, SqsEvent
 
@@ -42,6 +46,30 @@ class TestAwsSimulator:
         assert item_response is not None
         assert item_response["Item"] == {"pk": {"S": "1"}, "sk": {"S": "value"}}
 
+    def test_should_restore_snapshot(self):
+        aws_simulator = AwsSimulator()
+        queue = aws_simulator.create_sqs_queue("queue-name")
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+        snapshot = aws_simulator.snapshot()
+
+        aws_simulator.get_sqs_client().receive_message(QueueUrl=queue["queue_url"], VisibilityTimeout=60)
+        aws_simulator.create_sqs_queue("other-queue")
+        aws_simulator.create_dynamodb_table(
+            "test-table",
+            key_schema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            attribute_definition=[{"AttributeName": "pk", "AttributeType": "S"}],
+        )
+        aws_simulator.restore(snapshot)
+
+        assert aws_simulator.get_sqs_client().list_queues()["QueueUrls"] == [queue["queue_url"]]
+        assert aws_simulator.get_dynamodb_client().list_tables()["TableNames"] == []
+        messages = aws_simulator.get_sqs_client().receive_message(QueueUrl=queue["queue_url"])["Messages"]
+        assert json.loads(messages[0]["Body"]) == {"test": 123}
+
+        aws_simulator.restore(snapshot)
+        assert len(aws_simulator.get_sqs_client().receive_message(QueueUrl=queue["queue_url"])["Messages"]) == 1
+        aws_simulator.shutdown()
+
 
 class TestLambdaSimulator:
     @pytest.mark.asyncio
@@ -98,3 +126,98 @@ class TestLambdaSimulator:
         assert has_been_called["http"]
 
         aws_simulator.shutdown()
+
+
+class TestSimulatorLifecycle:
+    @pytest.mark.asyncio
+    async def test_should_start_and_stop_without_waiting_for_long_poll(self):
+        aws_simulator = AwsSimulator()
+        aws_simulator.create_sqs_queue("queue-name")
+        simulator = Simulator(port=0)
+        simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=print))
+        simulator.add_func(LambdaPureHttpFunc(name="test-http-lambda", method="GET", path="/http", handler_func=print))
+
+        await simulator.start()
+        assert simulator.http.port != 0
+        await simulator.stop()
+        aws_simulator.shutdown()
+
+        assert simulator.lifecycle.startup_seconds < 0.5
+        assert simulator.lifecycle.drain_seconds < 0.5
+
+    @pytest.mark.asyncio
+    async def test_should_drain_in_flight_invocations_on_stop(self):
+        aws_simulator = AwsSimulator()
+        queue = aws_simulator.create_sqs_queue("queue-name")
+        simulator = Simulator(port=0)
+        handler_started = threading.Event()
+
+        def sqs_handler(event: SqsEvent, context):
+            handler_started.set()
+            time.sleep(0.2)
+
+        simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+
+        await simulator.start()
+        while not handler_started.is_set():
+            await asyncio.sleep(0.01)
+        await simulator.stop(drain_timeout=5)
+
+        assert simulator.sqs.lifecycle.drained_invocations == 1
+        attributes = aws_simulator.get_sqs_client().get_queue_attributes(
+            QueueUrl=queue["queue_url"], AttributeNames=["All"]
+        )["Attributes"]
+        assert attributes["ApproximateNumberOfMessages"] == "0"
+        assert attributes["ApproximateNumberOfMessagesNotVisible"] == "0"
+        aws_simulator.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_should_release_messages_of_invocations_exceeding_drain_timeout(self):
+        aws_simulator = AwsSimulator()
+        queue = aws_simulator.create_sqs_queue("queue-name")
+        simulator = Simulator(port=0)
+        handler_started = threading.Event()
+        release_handler = threading.Event()
+
+        def sqs_handler(event: SqsEvent, context):
+            handler_started.set()
+            release_handler.wait(5)
+
+        simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+
+        await simulator.start()
+        while not handler_started.is_set():
+            await asyncio.sleep(0.01)
+        await simulator.stop(drain_timeout=0.05)
+
+        assert simulator.sqs.lifecycle.abandoned_invocations == 1
+        assert simulator.sqs.lifecycle.released_messages == 1
+        messages = aws_simulator.get_sqs_client().receive_message(QueueUrl=queue["queue_url"])["Messages"]
+        assert json.loads(messages[0]["Body"]) == {"test": 123}
+        release_handler.set()
+        aws_simulator.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_should_leave_no_pollers_running_when_http_port_is_taken(self):
+        aws_simulator = AwsSimulator()
+        aws_simulator.create_sqs_queue("queue-name")
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            sock.listen()
+            simulator = Simulator(port=sock.getsockname()[1])
+            simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=print))
+            simulator.add_func(
+                LambdaPureHttpFunc(name="test-http-lambda", method="GET", path="/http", handler_func=print)
+            )
+            tasks_before = asyncio.all_tasks()
+
+            with pytest.raises(OSError):
+                await simulator.start()
+
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == tasks_before
+        assert not simulator.sqs.is_started
+        assert simulator.http.runner is None
+        aws_simulator.shutdown()
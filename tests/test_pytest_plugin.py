@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+import aiohttp
+
+import py_lambda_simulator
+
+from py_lambda_simulator.http_lambda_simulator import LambdaHttpFunc
+from py_lambda_simulator.lambda_events import SqsEvent
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc
+
+pytest_plugins = ["pytester"]
+
+
+async def test_should_provide_sqs_simulator(aws_simulator, sqs_simulator):
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    bodies = []
+
+    def sqs_handler(event: SqsEvent, context):
+        bodies.append(json.loads(event["Records"][0]["body"]))
+        sqs_simulator.stop()
+
+    sqs_simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+    aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+
+    await sqs_simulator.start()
+    assert bodies == [{"test": 123}]
+
+
+async def test_should_provide_http_simulator_on_free_port(http_simulator):
+    def http_handler(event, context):
+        return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"ok": 1})}
+
+    http_simulator.add_func(
+        LambdaHttpFunc(name="test-http-lambda", method="GET", path="/http", handler_func=http_handler)
+    )
+    await http_simulator.start()
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://localhost:{http_simulator.port}/http") as resp:
+            assert resp.status == 200
+            assert json.loads(await resp.text()) == {"ok": 1}
+
+
+def test_should_reset_aws_state_between_tests(pytester, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.path.dirname(os.path.dirname(py_lambda_simulator.__file__)))
+    pytester.makepyfile("""
+        def test_creates_queue_and_table(aws_simulator):
+            aws_simulator.create_sqs_queue("queue-name")
+            aws_simulator.create_dynamodb_table(
+                "table-name",
+                key_schema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+                attribute_definition=[{"AttributeName": "pk", "AttributeType": "S"}],
+            )
+
+        def test_sees_no_queue_or_table(aws_simulator):
+            assert "QueueUrls" not in aws_simulator.get_sqs_client().list_queues()
+            assert aws_simulator.get_dynamodb_client().list_tables()["TableNames"] == []
+        """)
+
+    result = pytester.runpytest_subprocess("-p", "py_lambda_simulator.pytest_plugin")
+
+    result.assert_outcomes(passed=2)
+
+
+def test_should_report_failed_sqs_simulator_left_running(pytester, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.path.dirname(os.path.dirname(py_lambda_simulator.__file__)))
+    pytester.makepyfile("""
+        import asyncio
+
+        from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc
+
+        async def test_starts_simulator_in_background(sqs_simulator):
+            sqs_simulator.add_func(LambdaSqsFunc(name="f", queue_name="missing-queue", handler_func=print))
+            asyncio.ensure_future(sqs_simulator.start())
+            await asyncio.sleep(0.1)
+        """)
+
+    result = pytester.runpytest_subprocess("-p", "py_lambda_simulator.pytest_plugin", "-o", "asyncio_mode=auto")
+
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.fnmatch_lines(["*NonExistentQueue*"])
+
+
+def test_should_leave_logging_alone_when_loaded():
+    # Loaded by every pytest run once the package is installed, it must not configure the root logger.
+    code = (
+        "import logging\n"
+        "import py_lambda_simulator.pytest_plugin\n"
+        "print(logging.getLevelName(logging.getLogger().level), len(logging.getLogger().handlers))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+    assert output.split() == ["WARNING", "0"]
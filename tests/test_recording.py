@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from py_lambda_simulator.clock import VirtualClock
+from py_lambda_simulator.http_lambda_simulator import HttpLambdaSimulator, LambdaHttpFunc
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, SqsEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+from py_lambda_simulator.recording import InvocationRecorder, InvocationReplayer, read_recording
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
+
+
+@pytest.mark.asyncio
+async def test_should_record_http_invocations_and_replay_them(aiohttp_client, tmp_path):
+    path = str(tmp_path / "http.jsonl")
+    recorder = InvocationRecorder(path)
+    simulator = HttpLambdaSimulator(port=0, recorder=recorder)
+    client = await aiohttp_client(simulator.app)
+
+    def http_handler(event: ApiGatewayProxyEvent, context):
+        return {"statusCode": 200, "body": json.dumps({"echo": event.body, "method": event.requestContext.httpMethod})}
+
+    simulator.add_func(LambdaHttpFunc(name="test-http-lambda", method="POST", path="/http", handler_func=http_handler))
+
+    async def call_http_lambda():
+        for i in range(3):
+            resp = await client.post("/http", json={"key": i})
+            assert resp.status == 200
+        await simulator.stop()
+
+    await asyncio.gather(simulator.start(), call_http_lambda())
+    recorder.close()
+
+    lines = list(read_recording(path))
+    assert [line["event"]["body"] for line in lines] == [{"key": 0}, {"key": 1}, {"key": 2}]
+    assert all(line["source"] == "http" and line["error"] is None for line in lines)
+
+    report = await InvocationReplayer(path, speed=None).replay(simulator.funcs)
+    assert report.functions["test-http-lambda"].replayed.count == 3
+    assert report.functions["test-http-lambda"].response_mismatches == 0
+
+    def changed_handler(event: ApiGatewayProxyEvent, context):
+        if event.body["key"] == 2:
+            raise Exception("boom")
+        return {"statusCode": 201, "body": "changed"}
+
+    changed = {"test-http-lambda": LambdaHttpFunc("test-http-lambda", "POST", "/http", changed_handler)}
+    report = await InvocationReplayer(path, speed=None).replay(changed)
+    assert report.functions["test-http-lambda"].response_mismatches == 2
+    assert report.functions["test-http-lambda"].new_errors == 1
+    assert report.regressions() == ["test-http-lambda"]
+    assert "test-http-lambda" in report.format()
+
+
+@pytest.mark.asyncio
+async def test_should_replay_sqs_invocations_at_recorded_rate(tmp_path):
+    path = str(tmp_path / "sqs.jsonl")
+    aws_simulator = AwsSimulator()
+    clock = VirtualClock()
+    recorder = InvocationRecorder(path)
+    simulator = SqsLambdaSimulator(clock=clock, recorder=recorder)
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    bodies = []
+
+    def sqs_handler(event: SqsEvent, context):
+        bodies.append(json.loads(event["Records"][0]["body"]))
+        if len(bodies) == 2:
+            simulator.stop()
+
+    simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+
+    async def send_msgs():
+        for i in range(2):
+            aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"n": i}))
+            await clock.sleep(100)
+
+    await asyncio.gather(simulator.start(), send_msgs())
+    recorder.close()
+    aws_simulator.shutdown()
+
+    replay_clock = VirtualClock()
+    replayed_at = []
+
+    def replay_handler(event: SqsEvent, context):
+        replayed_at.append(replay_clock.time())
+
+    funcs = {"test-sqs-lambda": LambdaSqsFunc("test-sqs-lambda", "queue-name", replay_handler)}
+    report = await InvocationReplayer(path, speed=10, clock=replay_clock).replay(funcs)
+
+    assert report.functions["test-sqs-lambda"].replayed.count == 2
+    assert replayed_at == [0, 10]
+
+
+def test_should_write_buffered_invocations_in_order_on_close(tmp_path):
+    path = str(tmp_path / "buffered.jsonl")
+    recorder = InvocationRecorder(path, buffer_size=2)
+
+    recorder.record("sqs", "test-sqs-lambda", 0.0, {"n": 0}, None, 0.1)
+    assert list(read_recording(path)) == []
+    for n in range(1, 5):
+        recorder.record("sqs", "test-sqs-lambda", float(n), {"n": n}, None, 0.1)
+    recorder.close()
+
+    assert [line["event"] for line in read_recording(path)] == [{"n": n} for n in range(5)]
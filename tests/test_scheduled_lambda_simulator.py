@@ -0,0 +1,210 @@
+import asyncio
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from py_lambda_simulator.clock import RealClock, VirtualClock
+from py_lambda_simulator.lambda_events import ScheduledEvent
+from py_lambda_simulator.schedule_expressions import parse_schedule_expression
+from py_lambda_simulator.scheduled_lambda_simulator import LambdaScheduledFunc, ScheduledLambdaSimulator
+
+
+def _ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+class JumpingClock(RealClock):
+    """A real clock the test can move forward, to make the simulator miss fire times as if the host had slept."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    async def sleep(self, delay: float):
+        deadline = self.time() + delay
+        while self.time() < deadline:
+            await asyncio.sleep(min(0.01, deadline - self.time()))
+
+
+async def _miss_fire_times(policy: str, stop_after: int):
+    # rate(1 minute) fires 60 seconds after start, jumping 6.5 minutes misses six fire times by more than the grace.
+    clock = JumpingClock()
+    simulator = ScheduledLambdaSimulator(clock=clock)
+    events = []
+
+    def scheduled_handler(event: ScheduledEvent, context):
+        time.sleep(0.05)
+        events.append(event["time"])
+        if len(events) == stop_after:
+            simulator.stop()
+
+    simulator.add_func(
+        LambdaScheduledFunc(
+            name="test-scheduled-lambda",
+            schedule_expression="rate(1 minute)",
+            handler_func=scheduled_handler,
+            missed_fire_policy=policy,
+        )
+    )
+
+    async def miss_and_stop():
+        await simulator.wait_until_ready()
+        # Lets the simulator start sleeping until the first fire time before time jumps past it.
+        await asyncio.sleep(0.05)
+        clock.offset += 390
+        if not stop_after:
+            await asyncio.sleep(0.2)
+            simulator.stop()
+
+    await asyncio.wait_for(asyncio.gather(simulator.start(), miss_and_stop()), 10)
+    return simulator, events
+
+
+def test_should_compute_next_fire_time_for_cron_expressions():
+    daily = parse_schedule_expression("cron(0 12 * * ? *)")
+    assert daily.next_fire_time(_ts(2022, 1, 1, 13, 0)) == _ts(2022, 1, 2, 12, 0)
+
+    weekdays = parse_schedule_expression("cron(15 9 ? * MON-FRI *)")
+    # 2022-01-01 is a Saturday
+    assert weekdays.next_fire_time(_ts(2022, 1, 1, 10, 0)) == _ts(2022, 1, 3, 9, 15)
+
+    last_day = parse_schedule_expression("cron(0/30 0 L * ? 2024)")
+    assert last_day.next_fire_time(_ts(2024, 2, 10)) == _ts(2024, 2, 29, 0, 0)
+    assert last_day.next_fire_time(_ts(2024, 2, 29, 0, 0)) == _ts(2024, 2, 29, 0, 30)
+    assert last_day.next_fire_time(_ts(2024, 12, 31, 0, 30)) is None
+
+
+def test_should_compute_next_fire_time_for_rate_expressions():
+    assert parse_schedule_expression("rate(1 minute)").next_fire_time(100.0) == 160.0
+    assert parse_schedule_expression("rate(2 hours)").next_fire_time(100.0) == 7300.0
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["rate(1 minutes)", "rate(0 days)", "cron(0 12 * * * *)", "cron(0 12 ? * 2#1 *)", "every 5 minutes"],
+)
+def test_should_reject_invalid_schedule_expressions(expression):
+    with pytest.raises(Exception):
+        parse_schedule_expression(expression)
+
+
+@pytest.mark.asyncio
+async def test_should_invoke_scheduled_lambda(mocker):
+    # Shift the simulator's view of time to just before a minute boundary so the cron fires immediately.
+    real_time = time.time
+    now = real_time()
+    offset = math.ceil(now / 60) * 60 + 60 - 0.1 - now
+    mocker.patch("py_lambda_simulator.clock.time.time", side_effect=lambda: real_time() + offset)
+    simulator = ScheduledLambdaSimulator()
+    events = []
+
+    def scheduled_handler(event: ScheduledEvent, context):
+        events.append(event)
+        simulator.stop()
+
+    simulator.add_func(
+        LambdaScheduledFunc(
+            name="test-scheduled-lambda", schedule_expression="cron(* * * * ? *)", handler_func=scheduled_handler
+        )
+    )
+
+    await simulator.start()
+
+    assert len(events) == 1
+    assert events[0]["detail-type"] == "Scheduled Event"
+    assert events[0]["resources"] == ["arn:aws:events:us-east-1:123456789012:rule/test-scheduled-lambda"]
+    assert simulator.states["test-scheduled-lambda"].fired_count == 1
+
+
+@pytest.mark.asyncio
+async def test_should_fire_rate_schedule_on_virtual_clock():
+    clock = VirtualClock()
+    simulator = ScheduledLambdaSimulator(clock=clock)
+    fire_times = []
+
+    def scheduled_handler(event: ScheduledEvent, context):
+        fire_times.append(clock.time())
+        if len(fire_times) == 3:
+            simulator.stop()
+
+    simulator.add_func(
+        LambdaScheduledFunc(
+            name="test-scheduled-lambda", schedule_expression="rate(1 hour)", handler_func=scheduled_handler
+        )
+    )
+
+    await simulator.start()
+
+    assert fire_times == [3600, 7200, 10800]
+
+
+@pytest.mark.asyncio
+async def test_should_coalesce_missed_fire_times_with_fire_once():
+    simulator, events = await _miss_fire_times("fire_once", 1)
+    state = simulator.states["test-scheduled-lambda"]
+
+    assert len(events) == 1
+    assert (state.missed_count, state.fired_count, state.overlap_skipped_count) == (1, 1, 0)
+    assert simulator.get_next_fire_time("test-scheduled-lambda") > simulator.clock.time()
+
+
+@pytest.mark.asyncio
+async def test_should_catch_up_on_every_missed_fire_time_with_fire_all():
+    simulator, events = await _miss_fire_times("fire_all", 6)
+    state = simulator.states["test-scheduled-lambda"]
+
+    assert len(events) == 6
+    assert events == sorted(events)
+    assert (state.missed_count, state.fired_count, state.overlap_skipped_count) == (6, 6, 0)
+
+
+@pytest.mark.asyncio
+async def test_should_drop_missed_fire_times_with_skip():
+    simulator, events = await _miss_fire_times("skip", 0)
+    state = simulator.states["test-scheduled-lambda"]
+
+    assert events == []
+    assert (state.missed_count, state.fired_count) == (1, 0)
+    assert simulator.get_next_fire_time("test-scheduled-lambda") > simulator.clock.time()
+
+
+@pytest.mark.asyncio
+async def test_should_skip_fire_time_while_previous_invocation_is_running():
+    clock = JumpingClock()
+    simulator = ScheduledLambdaSimulator(clock=clock)
+    invoked = threading.Event()
+    release = threading.Event()
+    events = []
+
+    def scheduled_handler(event: ScheduledEvent, context):
+        events.append(event["time"])
+        invoked.set()
+        release.wait(5)
+
+    simulator.add_func(
+        LambdaScheduledFunc(
+            name="test-scheduled-lambda", schedule_expression="rate(1 minute)", handler_func=scheduled_handler
+        )
+    )
+
+    async def overlap():
+        await simulator.wait_until_ready()
+        await asyncio.sleep(0.05)
+        clock.offset += 60
+        await clock.run_in_thread(invoked.wait, 5)
+        # The next fire time comes due on time while the first invocation still runs.
+        clock.offset += 60
+        await asyncio.sleep(0.2)
+        release.set()
+        simulator.stop(drain_timeout=5)
+
+    await asyncio.wait_for(asyncio.gather(simulator.start(), overlap()), 10)
+    state = simulator.states["test-scheduled-lambda"]
+
+    assert len(events) == 1
+    assert (state.fired_count, state.missed_count, state.overlap_skipped_count) == (1, 0, 1)
@@ -0,0 +1,83 @@
+import csv
+import json
+
+import pytest
+
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+from py_lambda_simulator.seeding import read_csv, read_jsonl, seed_dynamodb_table
+
+
+def _create_table(aws_simulator: AwsSimulator):
+    aws_simulator.create_dynamodb_table(
+        "test-table",
+        key_schema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+        attribute_definition=[{"AttributeName": "pk", "AttributeType": "S"}],
+    )
+
+
+def _receive_all(aws_simulator: AwsSimulator, queue_url: str):
+    bodies = []
+    while True:
+        messages = aws_simulator.get_sqs_client().receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)
+        if not messages.get("Messages"):
+            return bodies
+        bodies.extend(json.loads(m["Body"]) for m in messages["Messages"])
+
+
+@pytest.mark.parametrize("direct", [False, True])
+def test_should_seed_queue_from_iterable(direct):
+    aws_simulator = AwsSimulator()
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    progress = []
+
+    result = aws_simulator.seed_sqs_queue(
+        "queue-name", ({"n": i} for i in range(35)), workers=3, direct=direct, progress=progress.append
+    )
+
+    assert result.count == 35
+    assert result.rate > 0
+    assert progress[-1].count == 35
+    assert sorted(body["n"] for body in _receive_all(aws_simulator, queue["queue_url"])) == list(range(35))
+    aws_simulator.shutdown()
+
+
+@pytest.mark.parametrize("direct", [False, True])
+def test_should_seed_table_from_jsonl_and_csv(tmp_path, direct):
+    aws_simulator = AwsSimulator()
+    _create_table(aws_simulator)
+    jsonl_path = tmp_path / "items.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps({"pk": f"json-{i}", "score": i + 0.5}) for i in range(30)))
+    csv_path = tmp_path / "items.csv"
+    with open(csv_path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["pk", "name"])
+        writer.writeheader()
+        writer.writerows({"pk": f"csv-{i}", "name": f"name-{i}"} for i in range(30))
+
+    aws_simulator.seed_dynamodb_table("test-table", read_jsonl(str(jsonl_path)), direct=direct)
+    aws_simulator.seed_dynamodb_table("test-table", read_csv(str(csv_path)), direct=direct)
+
+    client = aws_simulator.get_dynamodb_client()
+    assert client.scan(TableName="test-table", Select="COUNT")["Count"] == 60
+    assert client.get_item(TableName="test-table", Key={"pk": {"S": "json-3"}})["Item"]["score"] == {"N": "3.5"}
+    assert client.get_item(TableName="test-table", Key={"pk": {"S": "csv-3"}})["Item"]["name"] == {"S": "name-3"}
+    aws_simulator.shutdown()
+
+
+def test_should_retry_unprocessed_items(mocker):
+    client = mocker.Mock()
+    unprocessed = {"test-table": [{"PutRequest": {"Item": {"pk": {"S": "1"}}}}]}
+    client.batch_write_item.side_effect = [{"UnprocessedItems": unprocessed}, {"UnprocessedItems": {}}]
+
+    result = seed_dynamodb_table(client, "test-table", [{"pk": "1"}, {"pk": "2"}])
+
+    assert result.count == 2
+    assert client.batch_write_item.call_args_list[1].kwargs == {"RequestItems": unprocessed}
+
+
+def test_should_not_seed_fifo_queue_directly():
+    aws_simulator = AwsSimulator()
+    aws_simulator.get_sqs_client().create_queue(QueueName="queue.fifo", Attributes={"FifoQueue": "true"})
+
+    with pytest.raises(Exception, match="only supports standard queues"):
+        aws_simulator.seed_sqs_queue("queue.fifo", ["body"], direct=True)
+    aws_simulator.shutdown()
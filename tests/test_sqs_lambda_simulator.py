@@ -1,8 +1,11 @@
+import asyncio
 import json
+import time
 
 import boto3
 import pytest
 
+from py_lambda_simulator.clock import VirtualClock
 from py_lambda_simulator.lambda_events import SqsEvent
 from py_lambda_simulator.lambda_simulator import AwsSimulator
 from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
@@ -16,6 +19,8 @@ async def test_should_invoke_lambda_func_on_message():
 
     def sqs_handler(event: SqsEvent, context):
         assert json.loads(event["Records"][0]["body"]) == {"test": 123}
+        assert event["Records"][0]["eventSourceARN"].endswith(":queue-name")
+        assert event["Records"][0]["awsRegion"] == "us-east-1"
         simulator.stop()
 
     simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
@@ -125,3 +130,92 @@ async def test_should_invoke_lambda_from_lambda():
 
     await simulator.start()
     aws_simulator.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_should_gather_batches_larger_than_ten_msgs():
+    aws_simulator = AwsSimulator()
+    simulator = SqsLambdaSimulator()
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    batch_sizes = []
+
+    def sqs_handler(event: SqsEvent, context):
+        batch_sizes.append(len(event["Records"]))
+        simulator.stop()
+
+    simulator.add_func(
+        LambdaSqsFunc(
+            name="test-sqs-lambda",
+            queue_name="queue-name",
+            handler_func=sqs_handler,
+            max_number_of_messages=25,
+            maximum_batching_window_in_seconds=1,
+        )
+    )
+
+    for i in range(25):
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": i}))
+
+    await simulator.start()
+    aws_simulator.shutdown()
+
+    assert batch_sizes == [25]
+
+
+@pytest.mark.asyncio
+async def test_should_poll_on_virtual_clock():
+    aws_simulator = AwsSimulator()
+    clock = VirtualClock()
+    simulator = SqsLambdaSimulator(clock=clock)
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    received_at = []
+
+    def sqs_handler(event: SqsEvent, context):
+        received_at.append(clock.time())
+        simulator.stop()
+
+    simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+
+    async def send_msg_later():
+        await clock.sleep(600)
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+
+    started = time.monotonic()
+    await asyncio.gather(simulator.start(), send_msg_later())
+    aws_simulator.shutdown()
+
+    assert received_at == [600]
+    assert time.monotonic() - started < 10
+
+
+@pytest.mark.asyncio
+async def test_should_drain_other_functions_when_a_poller_fails():
+    aws_simulator = AwsSimulator()
+    simulator = SqsLambdaSimulator()
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    handler_started = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def sqs_handler(event: SqsEvent, context):
+        loop.call_soon_threadsafe(handler_started.set)
+        time.sleep(0.2)
+
+    simulator.add_func(LambdaSqsFunc(name="test-sqs-lambda", queue_name="queue-name", handler_func=sqs_handler))
+    aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"test": 123}))
+
+    async def add_failing_func():
+        await handler_started.wait()
+        simulator.add_func(LambdaSqsFunc(name="failing-sqs-lambda", queue_name="missing-queue", handler_func=print))
+
+    with pytest.raises(Exception, match="QueueDoesNotExist|does not exist"):
+        await asyncio.gather(simulator.start(), add_failing_func())
+
+    assert simulator.lifecycle.drained_invocations == 1
+    assert simulator.lifecycle.stopped_at is not None
+    assert not simulator.is_started
+    attributes = aws_simulator.get_sqs_client().get_queue_attributes(
+        QueueUrl=queue["queue_url"], AttributeNames=["All"]
+    )["Attributes"]
+    assert attributes["ApproximateNumberOfMessages"] == "0"
+    assert attributes["ApproximateNumberOfMessagesNotVisible"] == "0"
+    aws_simulator.shutdown()
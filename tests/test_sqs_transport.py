@@ -0,0 +1,125 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from py_lambda_simulator.lambda_events import SqsEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
+from py_lambda_simulator.sqs_transport import AioSqsTransport, BotoSqsTransport
+
+
+@pytest.mark.asyncio
+async def test_should_cache_queue_url_and_arn(mocker):
+    aws_simulator = AwsSimulator()
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    transport = BotoSqsTransport(region_name="us-east-1")
+    call = mocker.spy(transport, "_call")
+
+    first = await transport.get_queue("queue-name")
+    second = await transport.get_queue("queue-name")
+
+    assert first is second
+    assert first.url == queue["queue_url"]
+    assert first.arn.startswith("arn:aws:sqs:us-east-1:") and first.arn.endswith(":queue-name")
+    assert first.region == "us-east-1"
+    assert call.call_count == 2
+    aws_simulator.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_should_delete_and_release_messages_in_batches():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_sqs_queue("queue-name")
+    transport = BotoSqsTransport(region_name="us-east-1")
+    queue = await transport.get_queue("queue-name")
+    for i in range(15):
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue.url, MessageBody=json.dumps({"test": i}))
+
+    messages = await transport.receive_messages(queue, 10, 0)
+    messages += await transport.receive_messages(queue, 10, 0)
+    assert len(messages) == 15
+
+    await transport.release_messages(queue, messages[:12])
+    await transport.delete_messages(queue, messages[12:])
+
+    remaining = await transport.receive_messages(queue, 10, 0)
+    remaining += await transport.receive_messages(queue, 10, 0)
+    assert len(remaining) == 12
+    aws_simulator.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_should_explain_missing_aiobotocore(mocker):
+    mocker.patch.dict(sys.modules, {"aiobotocore": None, "aiobotocore.config": None, "aiobotocore.session": None})
+
+    with pytest.raises(Exception, match="requires aiobotocore"):
+        await AioSqsTransport().get_queue("queue-name")
+
+
+@pytest.mark.asyncio
+async def test_should_poll_many_queues_with_async_transport_against_moto_server(moto_server):
+    pytest.importorskip("aiobotocore")
+    queue_count = 20
+    aws_simulator = AwsSimulator(endpoint_url=moto_server)
+    received = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    async with AioSqsTransport(endpoint_url=moto_server, region_name="us-east-1") as transport:
+        simulator = SqsLambdaSimulator(transport=transport)
+
+        def sqs_handler(event: SqsEvent, context):
+            loop.call_soon_threadsafe(received.put_nowait, event["Records"][0])
+
+        for i in range(queue_count):
+            queue = aws_simulator.create_sqs_queue(f"queue-{i}")
+            aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps({"n": i}))
+            simulator.add_func(LambdaSqsFunc(name=f"sqs-lambda-{i}", queue_name=f"queue-{i}", handler_func=sqs_handler))
+
+        task = asyncio.ensure_future(simulator.start())
+        records = [await asyncio.wait_for(received.get(), 10) for _ in range(queue_count)]
+        simulator.stop()
+        await task
+
+    assert sorted(json.loads(r["body"])["n"] for r in records) == list(range(queue_count))
+    assert {r["eventSourceARN"].split(":")[-1] for r in records} == {f"queue-{i}" for i in range(queue_count)}
+    assert all(r["awsRegion"] == "us-east-1" and r["eventSource"] == "aws:sqs" for r in records)
+
+
+@pytest.mark.asyncio
+async def test_should_not_hold_up_busy_queue_behind_long_polls_on_empty_queues(moto_server):
+    pytest.importorskip("aiobotocore")
+    queue_count = 8
+    aws_simulator = AwsSimulator(endpoint_url=moto_server)
+    received = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    async with AioSqsTransport(endpoint_url=moto_server, region_name="us-east-1") as transport:
+        simulator = SqsLambdaSimulator(transport=transport)
+        simulator.wait_time_seconds = 2
+
+        def sqs_handler(event: SqsEvent, context):
+            loop.call_soon_threadsafe(received.put_nowait, event["Records"][0])
+
+        queues = [aws_simulator.create_sqs_queue(f"queue-{i}") for i in range(queue_count)]
+        for i in range(queue_count):
+            simulator.add_func(LambdaSqsFunc(name=f"sqs-lambda-{i}", queue_name=f"queue-{i}", handler_func=sqs_handler))
+
+        task = asyncio.ensure_future(simulator.start())
+        await simulator.wait_until_ready()
+        # Lets every poller start its long poll before the message arrives.
+        await asyncio.sleep(0.5)
+        sent = loop.time()
+        aws_simulator.get_sqs_client().send_message(
+            QueueUrl=queues[-1]["queue_url"], MessageBody=json.dumps({"n": queue_count - 1})
+        )
+        record = await asyncio.wait_for(received.get(), 10)
+        handled_after = loop.time() - sent
+        simulator.stop()
+        await task
+
+    assert record["eventSourceARN"].endswith(f":queue-{queue_count - 1}")
+    # Polled one queue at a time this waits out a long poll on each of the empty queues.
+    assert handled_after < simulator.wait_time_seconds
+    aws_simulator.shutdown()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+
+import boto3
+import pytest
+from botocore.client import BaseClient
+
+from py_lambda_simulator.lambda_events import ApiGatewayProxyEvent, SqsEvent
+from py_lambda_simulator.lambda_simulator import AwsSimulator, HttpLambdaSimulator, LambdaHttpFunc
+from py_lambda_simulator.sqs_lambda_simulator import LambdaSqsFunc, SqsLambdaSimulator
+from py_lambda_simulator.tracing import (
+    TRACE_HEADER,
+    InMemorySpanCollector,
+    JsonlSpanCollector,
+    TraceContext,
+    get_current_trace,
+    parse_trace_header,
+    instrument_botocore,
+    read_spans,
+    uninstrument_botocore,
+)
+
+
+def test_should_parse_and_format_trace_headers():
+    header = "Root=1-5759e988-bd862e3fe1be46a994272793;Parent=53995c3f42cd8ad8;Sampled=1"
+    context = parse_trace_header(header)
+
+    assert context == TraceContext(trace_id="1-5759e988-bd862e3fe1be46a994272793", parent_id="53995c3f42cd8ad8")
+    assert context.to_header() == header
+    assert parse_trace_header("Root=1-abc;Sampled=0").sampled is False
+    assert parse_trace_header("Parent=53995c3f42cd8ad8") is None
+    assert parse_trace_header(None) is None
+
+
+@pytest.mark.asyncio
+async def test_should_trace_invocation_chain_through_sqs():
+    aws_simulator = AwsSimulator()
+    collector = InMemorySpanCollector()
+    simulator = SqsLambdaSimulator(span_collector=collector)
+    aws_simulator.create_sqs_queue("queue-name-1")
+    queue_2 = aws_simulator.create_sqs_queue("queue-name-2")
+    headers = []
+
+    def sqs_handler_1(event: SqsEvent, context):
+        headers.append(get_current_trace().to_header())
+        boto3.client("sqs").send_message(QueueUrl=queue_2["queue_url"], MessageBody=json.dumps({"hop": 2}))
+
+    def sqs_handler_2(event: SqsEvent, context):
+        headers.append(event["Records"][0]["attributes"]["AWSTraceHeader"])
+        simulator.stop()
+
+    simulator.add_func(LambdaSqsFunc(name="first", queue_name="queue-name-1", handler_func=sqs_handler_1))
+    simulator.add_func(LambdaSqsFunc(name="second", queue_name="queue-name-2", handler_func=sqs_handler_2))
+    aws_simulator.seed_sqs_queue("queue-name-1", [{"hop": 1}])
+
+    await simulator.start()
+    aws_simulator.shutdown()
+
+    first, second = sorted(collector.spans, key=lambda span: span.start)
+    assert headers[0] == headers[1]
+    assert (first.function, second.function) == ("first", "second")
+    assert first.trace_id == second.trace_id
+    assert first.parent_id is None
+    assert second.parent_id == first.span_id
+    assert first.queue_wait >= 0 and second.queue_wait >= 0
+    assert collector.get_trace(first.trace_id) == [first, second]
+    assert collector.get_trace_duration(first.trace_id) >= second.end - first.start
+
+
+@pytest.mark.asyncio
+async def test_should_trace_messages_sent_with_client_created_before_simulator_started():
+    aws_simulator = AwsSimulator()
+    aws_simulator.create_sqs_queue("queue-name-1")
+    queue_2 = aws_simulator.create_sqs_queue("queue-name-2")
+    # Like a client created at module level in a handler module.
+    sqs_client = boto3.client("sqs")
+    make_api_call = BaseClient._make_api_call
+    collector = InMemorySpanCollector()
+    simulator = SqsLambdaSimulator(span_collector=collector)
+
+    def sqs_handler_1(event: SqsEvent, context):
+        sqs_client.send_message(QueueUrl=queue_2["queue_url"], MessageBody=json.dumps({"hop": 2}))
+
+    def sqs_handler_2(event: SqsEvent, context):
+        simulator.stop()
+
+    simulator.add_func(LambdaSqsFunc(name="first", queue_name="queue-name-1", handler_func=sqs_handler_1))
+    simulator.add_func(LambdaSqsFunc(name="second", queue_name="queue-name-2", handler_func=sqs_handler_2))
+    aws_simulator.seed_sqs_queue("queue-name-1", [{"hop": 1}])
+
+    await asyncio.wait_for(simulator.start(), 10)
+    aws_simulator.shutdown()
+
+    first, second = sorted(collector.spans, key=lambda span: span.start)
+    assert second.trace_id == first.trace_id
+    assert second.parent_id == first.span_id
+    assert BaseClient._make_api_call is make_api_call
+
+
+def test_should_restore_botocore_once_last_instrumentation_is_removed():
+    make_api_call = BaseClient._make_api_call
+
+    instrument_botocore()
+    instrument_botocore()
+    patched = BaseClient._make_api_call
+    uninstrument_botocore()
+    assert BaseClient._make_api_call is patched
+    assert patched is not make_api_call
+    uninstrument_botocore()
+    assert BaseClient._make_api_call is make_api_call
+    uninstrument_botocore()
+    assert BaseClient._make_api_call is make_api_call
+
+
+@pytest.mark.asyncio
+async def test_should_continue_trace_from_http_request(aiohttp_client, tmp_path):
+    aws_simulator = AwsSimulator()
+    queue = aws_simulator.create_sqs_queue("queue-name")
+    collector = JsonlSpanCollector(str(tmp_path / "spans.jsonl"))
+    http_simulator = HttpLambdaSimulator(span_collector=collector)
+    sqs_simulator = SqsLambdaSimulator(span_collector=collector)
+    client = await aiohttp_client(http_simulator.app)
+
+    def http_handler(event: ApiGatewayProxyEvent, context):
+        aws_simulator.get_sqs_client().send_message(QueueUrl=queue["queue_url"], MessageBody=json.dumps(event.body))
+        return {"statusCode": 202}
+
+    def sqs_handler(event: SqsEvent, context):
+        sqs_simulator.stop()
+
+    http_simulator.add_func(LambdaHttpFunc(name="api", method="POST", path="/orders", handler_func=http_handler))
+    sqs_simulator.add_func(LambdaSqsFunc(name="worker", queue_name="queue-name", handler_func=sqs_handler))
+
+    async def request():
+        headers = {TRACE_HEADER: "Root=1-5759e988-bd862e3fe1be46a994272793;Parent=53995c3f42cd8ad8;Sampled=1"}
+        resp = await client.post("/orders", json={"id": 1}, headers=headers)
+        assert resp.status == 202
+
+    await http_simulator.start()
+    await asyncio.gather(sqs_simulator.start(), request())
+    await http_simulator.stop()
+    aws_simulator.shutdown()
+    collector.close()
+
+    api, worker = read_spans(str(tmp_path / "spans.jsonl"))
+    assert api.trace_id == worker.trace_id == "1-5759e988-bd862e3fe1be46a994272793"
+    assert api.parent_id == "53995c3f42cd8ad8"
+    assert (worker.function, worker.source, worker.parent_id) == ("worker", "sqs", api.span_id)
+    assert api.queue_wait is None
+
+
+@pytest.mark.asyncio
+async def test_should_not_collect_unsampled_traces():
+    aws_simulator = AwsSimulator()
+    collector = InMemorySpanCollector()
+    simulator = SqsLambdaSimulator(span_collector=collector)
+    queue = aws_simulator.create_sqs_queue("queue-name")
+
+    def sqs_handler(event: SqsEvent, context):
+        simulator.stop()
+
+    simulator.add_func(LambdaSqsFunc(name="f", queue_name="queue-name", handler_func=sqs_handler))
+    aws_simulator.get_sqs_client().send_message(
+        QueueUrl=queue["queue_url"],
+        MessageBody="{}",
+        MessageSystemAttributes={"AWSTraceHeader": {"DataType": "String", "StringValue": "Root=1-abc;Sampled=0"}},
+    )
+
+    await simulator.start()
+    aws_simulator.shutdown()
+
+    assert collector.spans == []